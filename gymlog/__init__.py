@@ -1,32 +1,89 @@
 #!/usr/bin/env python3
 
-from flask import Flask, Response
+from typing import Optional
+
+from flask import Flask, Response, g
 
 app = Flask(__name__)
+app.config.from_mapping(
+    # Path to SQLite database file
+    DATABASE="data/gym-log.db",
+    # Name of pragma profile in gymlog.models.DATABASE_PROFILES
+    DATABASE_PROFILE="production",
+    # Pragmas to set in addition to, or instead of, those in the profile
+    DATABASE_PRAGMAS={},
+    # Maximum number of database connections in each worker. This must be at least
+    # the number of threads serving requests in the worker.
+    DATABASE_POOL_SIZE=32,
+    # Time to wait for a free connection when all of them are in use, in seconds
+    DATABASE_POOL_TIMEOUT=10,
+    # Number of sets inserted per statement when syncing sets saved offline
+    SYNC_CHUNK_SIZE=100,
+    # Number of sets inserted per transaction when importing sets
+    IMPORT_CHUNK_SIZE=10000,
+    # IANA timezone used to decide which day sets were logged on, e.g.
+    # "Europe/London". The server's local time is used if not set.
+    TIMEZONE=None,
+    # Number of rendered pages to cache in each worker, 0 to disable the cache
+    PAGE_CACHE_SIZE=0,
+    # Number of set writes waiting for the group commit writer in each worker, 0 to
+    # disable group commit and write directly from each request
+    WRITE_QUEUE_SIZE=0,
+    # Maximum number of writes committed in each group commit transaction
+    WRITE_BATCH_SIZE=64,
+    # Time to wait for more writes before committing, in milliseconds
+    WRITE_BATCH_DELAY_MS=5,
+    # Time to wait for space in a full write queue before returning 503, in seconds
+    WRITE_QUEUE_TIMEOUT=5,
+    # Directory to write request profiles to, profiling is disabled if not set
+    PROFILE_DIR=None,
+    # Profile every request, instead of only those with an X-Profile header
+    PROFILE_ALL=False,
+    # Client addresses allowed to request a profile with the X-Profile header
+    PROFILE_ALLOWED_ADDRESSES=["127.0.0.1"],
+    # Number of most recent profiles to keep
+    PROFILE_MAX_FILES=20,
+)
+# Override defaults from GYMLOG_ prefixed environment variables
+# e.g. GYMLOG_DATABASE=/app/data/gym-log.db
+#      GYMLOG_DATABASE_PRAGMAS='{"cache_size": -64000}'
+app.config.from_prefixed_env("GYMLOG")
 
 import gymlog.views  # noqa: E402, F401
-from gymlog.models import (  # noqa: E402
-    database,
-    Exercise,
-    Workout,
-    Sets,
-    WorkoutExercise,
+import gymlog.commands  # noqa: E402, F401
+from gymlog.models import database, DATABASE_PROFILES  # noqa: E402
+from gymlog.migrations import migrate_database  # noqa: E402
+
+database.init(
+    app.config["DATABASE"],
+    max_connections=app.config["DATABASE_POOL_SIZE"],
+    timeout=app.config["DATABASE_POOL_TIMEOUT"],
+    pragmas={
+        **DATABASE_PROFILES[app.config["DATABASE_PROFILE"]],
+        **app.config["DATABASE_PRAGMAS"],
+    },
 )
 
-# Initialise the databse, only if the tables don't already exist
-database.create_tables([Exercise, Workout, Sets, WorkoutExercise], safe=True)
+# Initialise the database, or apply any outstanding migrations to an existing one
+migrate_database()
 database.close()
 
+if app.config["PROFILE_DIR"]:
+    from gymlog.profiler import RequestProfiler
 
-@app.before_request
-def before_request():
-    """Connect to database before processing each request"""
-    database.connect()
+    app.wsgi_app = RequestProfiler(
+        app.wsgi_app,
+        app.config["PROFILE_DIR"],
+        app.config["PROFILE_ALL"],
+        app.config["PROFILE_ALLOWED_ADDRESSES"],
+        app.config["PROFILE_MAX_FILES"],
+    )
 
 
 @app.after_request
 def after_request(response: Response) -> Response:
-    """Close database connection after processing each request
+    """In debug mode, add the number of database queries saved by the per-request
+    exercise and workout cache to the response headers.
 
     Parameters
     ----------
@@ -38,8 +95,25 @@ def after_request(response: Response) -> Response:
     Response
         Request Response object
     """
-    database.close()
+    if app.debug:
+        response.headers["X-Entity-Cache-Hits"] = str(g.get("entity_cache_hits", 0))
     return response
 
 
+@app.teardown_request
+def teardown_request(exception: Optional[BaseException]) -> None:
+    """Return database connection to the pool after processing each request.
+
+    Connections are opened when a request first runs a query, so requests that
+    don't use the database, such as static files, never open one.
+
+    Parameters
+    ----------
+    exception : Optional[BaseException]
+        Unhandled exception raised while processing the request, if any
+    """
+    if not database.is_closed():
+        database.close()
+
+
 __version__ = "0.1.0"
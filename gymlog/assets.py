@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+from typing import Any, Dict
+
+from flask import Response, request
+
+from gymlog import app
+
+# Static files that aren't fingerprinted or precached. The service worker must keep
+# the same URL and the TypeScript sources aren't used by the browser.
+UNHASHED_STATIC_FILES = {"service-worker.js", "js/tsconfig.json"}
+UNHASHED_STATIC_EXTENSIONS = (".ts",)
+
+# Cache lifetime of fingerprinted static files, in seconds
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Placeholder in service-worker.js that is replaced with the precache manifest
+PRECACHE_MANIFEST_PLACEHOLDER = b"self.__PRECACHE_MANIFEST"
+
+
+def hash_static_files(static_folder: str) -> Dict[str, str]:
+    """Return a short hash of the contents of each file in the static folder.
+
+    Parameters
+    ----------
+    static_folder : str
+        Path to static folder
+
+    Returns
+    -------
+    Dict[str, str]
+        Hash of each file, keyed by path relative to the static folder, as used for
+        url_for("static", filename=...)
+    """
+    hashes = {}
+    for directory, _, filenames in os.walk(static_folder):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            if name in UNHASHED_STATIC_FILES or name.endswith(
+                UNHASHED_STATIC_EXTENSIONS
+            ):
+                continue
+
+            with open(path, "rb") as f:
+                hashes[name] = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    return dict(sorted(hashes.items()))
+
+
+def precache_manifest(hashes: Dict[str, str]) -> Dict[str, Any]:
+    """Return manifest of static files for the service worker to precache.
+
+    Parameters
+    ----------
+    hashes : Dict[str, str]
+        Hash of each static file, from hash_static_files
+
+    Returns
+    -------
+    Dict[str, Any]
+        Dict with the following keys
+            version: hash of all the static files, which changes if any of them do
+            urls: fingerprinted URL of each file, keyed by its plain URL
+    """
+    version = hashlib.sha256(json.dumps(hashes).encode()).hexdigest()[:12]
+    urls = {
+        f"{app.static_url_path}/{name}": f"{app.static_url_path}/{name}?v={hash_}"
+        for name, hash_ in hashes.items()
+    }
+    return {"version": version, "urls": urls}
+
+
+# Static files are fingerprinted once at startup, so the server must be restarted
+# after they are changed
+STATIC_HASHES = hash_static_files(app.static_folder)
+PRECACHE_MANIFEST = precache_manifest(STATIC_HASHES)
+ASSETS_VERSION = PRECACHE_MANIFEST["version"]
+
+
+@app.url_defaults
+def add_static_hash(endpoint: str, values: Dict[str, Any]) -> None:
+    """Add hash of file contents to the URL of static files built with url_for, so
+    the URL changes whenever the file does.
+
+    Parameters
+    ----------
+    endpoint : str
+        Endpoint of URL
+    values : Dict[str, Any]
+        Values for URL, modified in place
+    """
+    if endpoint == "static" and "v" not in values:
+        hash_ = STATIC_HASHES.get(values.get("filename"))
+        if hash_ is not None:
+            values["v"] = hash_
+
+
+@app.after_request
+def cache_static_files(response: Response) -> Response:
+    """Allow static files requested with the hash of their current contents to be
+    cached forever, without revalidation.
+
+    Static files requested without a hash, or with an outdated one, keep Flask's
+    default headers and are revalidated on each use.
+
+    Parameters
+    ----------
+    response : Response
+        Request Response object
+
+    Returns
+    -------
+    Response
+        Request Response object
+    """
+    if (
+        request.endpoint == "static"
+        and response.status_code in (200, 304)
+        and request.args.get("v") is not None
+        and request.args.get("v") == STATIC_HASHES.get(request.view_args["filename"])
+    ):
+        response.cache_control.public = True
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def render_service_worker() -> bytes:
+    """Return service worker script, with the precache manifest in place of
+    PRECACHE_MANIFEST_PLACEHOLDER.
+
+    Including the manifest in the script means the script changes whenever a static
+    file does, which makes browsers install the new service worker.
+
+    Returns
+    -------
+    bytes
+        Service worker script
+    """
+    with open(os.path.join(app.static_folder, "service-worker.js"), "rb") as f:
+        script = f.read()
+
+    manifest = json.dumps(PRECACHE_MANIFEST, indent=2).encode()
+    return script.replace(PRECACHE_MANIFEST_PLACEHOLDER, manifest, 1)
+
+
+SERVICE_WORKER = render_service_worker()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import click
+
+from gymlog import app
+from gymlog.export import EXPORT_MIMETYPES, export_sets
+from gymlog.importer import IMPORT_FORMATS, format_from_filename, read_sets
+from gymlog.interfaces import WorkoutInterface
+
+W = WorkoutInterface(app.config["TIMEZONE"])
+
+
+@app.cli.command("rebuild-stats")
+def rebuild_stats():
+    """Recalculate the stored statistics for every exercise from its sets."""
+    W.rebuild_exercise_stats()
+    click.echo("Rebuilt exercise statistics")
+
+
+@app.cli.command("export-sets")
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(list(EXPORT_MIMETYPES)),
+    default="csv",
+    help="Export format.",
+)
+@click.option("--gzip", "compress", is_flag=True, help="Compress output with gzip.")
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("wb"),
+    default="-",
+    help="File to write to, defaults to stdout.",
+)
+def export_sets_command(format_, compress, output):
+    """Export every set, with the name of its exercise, as CSV or NDJSON."""
+    for chunk in export_sets(W.iter_sets_for_export(), format_, compress):
+        output.write(chunk)
+
+
+@app.cli.command("import-sets")
+@click.argument("filename", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(sorted(set(IMPORT_FORMATS.values()))),
+    help="Import format, taken from the file extension if not given.",
+)
+def import_sets_command(filename, format_):
+    """Import sets from a CSV, NDJSON or JSON file, optionally compressed with gzip,
+    in the same format as the export."""
+    format_ = format_ or format_from_filename(filename)
+    if format_ is None:
+        raise click.UsageError(f"Unknown import format for {filename}, use --format")
+
+    def show_progress(result):
+        click.echo(
+            f"Read {result['rows']} rows, inserted {result['inserted']}", err=True
+        )
+
+    with open(filename, "rb") as f:
+        rows = read_sets(f, format_, filename.lower().endswith(".gz"))
+        try:
+            result = W.import_sets(
+                rows, app.config["IMPORT_CHUNK_SIZE"], progress=show_progress
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+    for error in result["errors"]:
+        click.echo(error, err=True)
+    if result["exercises_created"]:
+        created = result["exercises_created"]
+        click.echo(f"Created {len(created)} exercises: {', '.join(created)}")
+    click.echo(
+        f"Imported {result['inserted']} sets from {result['rows']} rows, "
+        f"ignored {result['duplicates']} duplicates and {result['invalid']} invalid"
+    )
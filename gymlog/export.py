@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import csv
+import io
+import json
+import zlib
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from gymlog.interfaces.workout import EXPORT_COLUMNS
+
+# Number of rows formatted into each chunk of output
+EXPORT_CHUNK_ROWS = 1000
+
+# Mimetype of each export format
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _chunks(
+    rows: Iterable[Tuple[Any, ...]], size: int
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """Split rows into lists of up to `size` rows
+
+    Parameters
+    ----------
+    rows : Iterable[Tuple[Any, ...]]
+        Rows to split
+    size : int
+        Number of rows in each group
+
+    Yields
+    ------
+    List[Tuple[Any, ...]]
+        Group of rows
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def export_csv(rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    """Format rows as CSV, with a header row
+
+    Parameters
+    ----------
+    rows : Iterable[Tuple[Any, ...]]
+        Rows of values in the same order as EXPORT_COLUMNS
+
+    Yields
+    ------
+    str
+        CSV text for up to EXPORT_CHUNK_ROWS rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for chunk in _chunks(rows, EXPORT_CHUNK_ROWS):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def export_ndjson(rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    """Format rows as newline delimited JSON, with one object per row
+
+    Parameters
+    ----------
+    rows : Iterable[Tuple[Any, ...]]
+        Rows of values in the same order as EXPORT_COLUMNS
+
+    Yields
+    ------
+    str
+        JSON lines for up to EXPORT_CHUNK_ROWS rows
+    """
+    for chunk in _chunks(rows, EXPORT_CHUNK_ROWS):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in chunk
+        )
+
+
+def export_sets(
+    rows: Iterable[Tuple[Any, ...]], format_: str, compress: bool = False
+) -> Iterator[bytes]:
+    """Format rows for export, optionally compressing them with gzip
+
+    Parameters
+    ----------
+    rows : Iterable[Tuple[Any, ...]]
+        Rows of values in the same order as EXPORT_COLUMNS
+    format_ : str
+        Export format, "csv" or "ndjson"
+    compress : bool, optional
+        Compress output with gzip
+
+    Yields
+    ------
+    bytes
+        Chunk of exported data
+
+    Raises
+    ------
+    ValueError
+        If format_ is not a supported format
+    """
+    if format_ == "csv":
+        chunks = export_csv(rows)
+    elif format_ == "ndjson":
+        chunks = export_ndjson(rows)
+    else:
+        raise ValueError(f"Unsupported export format: {format_}")
+
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode()
+        return
+
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
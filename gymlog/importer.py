@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import csv
+import gzip
+import io
+import json
+import zlib
+from typing import IO, Any, Dict, Iterator, Optional
+
+# Import formats, keyed by file extension
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "json",
+}
+
+
+def format_from_filename(filename: str) -> Optional[str]:
+    """Return import format for file name, ignoring any .gz extension
+
+    Parameters
+    ----------
+    filename : str
+        Name of file to import
+
+    Returns
+    -------
+    Optional[str]
+        Import format, or None if the extension isn't recognised
+    """
+    name = filename.lower().removesuffix(".gz")
+    for extension, format_ in IMPORT_FORMATS.items():
+        if name.endswith(extension):
+            return format_
+
+    return None
+
+
+def read_sets(
+    file: IO[bytes], format_: str, compressed: bool
+) -> Iterator[Dict[str, Any]]:
+    """Read sets from file, for WorkoutInterface.import_sets
+
+    CSV and NDJSON files are read one row at a time. JSON files must contain a
+    list of objects and are read all at once, so NDJSON should be used for large
+    imports.
+
+    Parameters
+    ----------
+    file : IO[bytes]
+        File to read, opened in binary mode
+    format_ : str
+        File format, "csv", "ndjson" or "json"
+    compressed : bool
+        File is compressed with gzip
+
+    Yields
+    ------
+    Dict[str, Any]
+        Set, with the same keys as the export
+
+    Raises
+    ------
+    ValueError
+        If format_ is not a supported format, a JSON file doesn't contain a list, or
+        the file can't be read, e.g. because it isn't valid gzip, CSV or JSON
+    """
+    if format_ not in IMPORT_FORMATS.values():
+        raise ValueError(f"Unsupported import format: {format_}")
+
+    if compressed:
+        file = gzip.GzipFile(fileobj=file)
+    # utf-8-sig skips the byte order mark that some spreadsheets add
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+    try:
+        if format_ == "csv":
+            yield from csv.DictReader(text)
+        elif format_ == "ndjson":
+            for line in text:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            sets = json.load(text)
+            if not isinstance(sets, list):
+                raise ValueError("JSON import must be a list of sets")
+            yield from sets
+    except (OSError, EOFError, zlib.error, csv.Error) as e:
+        # gzip raises OSError, EOFError or zlib.error for invalid or truncated files
+        raise ValueError(f"Could not read {format_} file: {e}") from e
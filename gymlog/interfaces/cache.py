@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from flask import g, has_app_context
+
+from gymlog.models import DataVersion
+
+
+class VersionedCache:
+    """In-process LRU cache, with entries that expire after `ttl` seconds, for data
+    that rarely changes such as exercise and workout names.
+
+    The cache is tied to a version number stored in the database, which is
+    incremented whenever the cached data is changed by any worker. If the version in
+    the database differs from the version the cache was populated at, the cache is
+    cleared.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version: Optional[Hashable] = None
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return cached value for key
+
+        Parameters
+        ----------
+        key : Hashable
+            Cache key
+
+        Returns
+        -------
+        Tuple[bool, Any]
+            True if key was found in cache and has not expired
+            Cached value, or None if not found
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value in cache, evicting the least recently used entry if full
+
+        Parameters
+        ----------
+        key : Hashable
+            Cache key
+        value : Any
+            Value to cache
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries from cache and forget version"""
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def validate(self, version: Hashable) -> None:
+        """Clear cache if it was populated at a different version
+
+        Parameters
+        ----------
+        version : Hashable
+            Current version of cached data
+        """
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+
+metadata_cache = VersionedCache()
+
+
+def get_data_version(name: str) -> int:
+    """Return current version of named data
+
+    Parameters
+    ----------
+    name : str
+        Name of data e.g. "metadata"
+
+    Returns
+    -------
+    int
+        Version number, 0 if the data has never been changed
+    """
+    version = (
+        DataVersion.select(DataVersion.version).where(DataVersion.name == name).scalar()
+    )
+    return version or 0
+
+
+def bump_data_version(name: str) -> None:
+    """Increment version of named data.
+    This should be called in the same transaction as the change to the data.
+
+    Parameters
+    ----------
+    name : str
+        Name of data e.g. "metadata"
+    """
+    DataVersion.insert(name=name, version=1).on_conflict(
+        conflict_target=[DataVersion.name],
+        update={DataVersion.version: DataVersion.version + 1},
+    ).execute()
+
+
+def invalidate_pages() -> None:
+    """Mark all rendered pages as changed, so their ETags no longer match.
+    This should be called in the same transaction as any change to the data.
+    """
+    bump_data_version("data")
+
+
+def invalidate_metadata() -> None:
+    """Mark cached metadata as changed in all workers and clear the cache in this one.
+    Rendered pages are also invalidated, because they include the metadata.
+    This should be called in the same transaction as the change to the metadata.
+    """
+    invalidate_pages()
+    bump_data_version("metadata")
+    metadata_cache.clear()
+    if has_app_context():
+        g.pop("metadata_version_checked", None)
+
+
+def _validate_metadata_cache() -> None:
+    """Check cached metadata is current against the version in the database.
+    During a request this is only checked once, on first use of the cache.
+    """
+    if has_app_context():
+        if g.get("metadata_version_checked", False):
+            return
+        g.metadata_version_checked = True
+
+    metadata_cache.validate(get_data_version("metadata"))
+
+
+def cached_metadata(method: Callable) -> Callable:
+    """Decorator for WorkoutInterface methods that return exercise or workout
+    metadata, to cache the return value by method name and arguments.
+
+    Parameters
+    ----------
+    method : Callable
+        Method to cache
+
+    Returns
+    -------
+    Callable
+        Wrapped method
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        _validate_metadata_cache()
+
+        # IDs may come from the URL or the query string, so normalise to string
+        key = (method.__name__, *(str(arg) for arg in args))
+        found, value = metadata_cache.get(key)
+        if not found:
+            value = method(self, *args)
+            metadata_cache.set(key, value)
+
+        return value
+
+    return wrapper
@@ -3,12 +3,91 @@
 import datetime
 import math
 import uuid
+import zoneinfo
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
-
-from peewee import fn, IntegrityError
-
-from gymlog.models import Workout, Exercise, Sets, WorkoutExercise
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from flask import g, has_app_context
+from peewee import fn, Case, JOIN, Model, Select, Value
+
+from gymlog.interfaces.cache import (
+    cached_metadata,
+    invalidate_metadata,
+    invalidate_pages,
+)
+from gymlog.models import (
+    database,
+    ChangeLog,
+    Workout,
+    Exercise,
+    ExerciseStatistics,
+    Sets,
+    WorkoutExercise,
+)
+
+# Columns of the rows returned by WorkoutInterface.iter_sets_for_export
+EXPORT_COLUMNS = (
+    "uid",
+    "uuid",
+    "datetime",
+    "exercise",
+    "exercise_type",
+    "distance_m",
+    "weight_kg",
+    "repetitions",
+    "time_s",
+)
+
+# Set fields that must have a value for each exercise type. Other value fields are
+# left empty.
+EXERCISE_TYPE_FIELDS = {
+    "weight-repetitions": ("weight_kg", "repetitions"),
+    "distance-time": ("distance_m", "time_s"),
+    "time": ("time_s",),
+}
+
+# Type of each set value field, for converting imported values
+IMPORT_FIELD_TYPES = {
+    "distance_m": float,
+    "weight_kg": float,
+    "repetitions": int,
+    "time_s": int,
+}
+
+# Namespace for UUIDs derived from the content of imported sets that don't have one
+IMPORT_UUID_NAMESPACE = uuid.UUID("cf08c3f4-b8f0-48c3-b400-9dd05e3858e8")
+
+# Maximum number of invalid row messages returned by WorkoutInterface.import_sets
+MAX_IMPORT_ERRORS = 100
+
+# Types of entity recorded in the change log
+CHANGE_ENTITIES = ("exercise", "workout", "set")
+
+# SQL expression for the value plotted in the exercise history for each exercise type
+HISTORY_VALUES = {
+    "weight-repetitions": Sets.weight_kg * Sets.repetitions,
+    "distance-time": Sets.distance_m / Sets.time_s,
+    "time": Sets.time_s,
+}
+
+# SQL expression for the value summed in the total for the last year. Only the fields
+# relevant to the exercise type are set, so this is weight*repetitions for
+# weight-repetition exercises, distance for distance-time exercises and time for
+# time exercises.
+STATS_TOTAL = fn.COALESCE(
+    Sets.weight_kg * Sets.repetitions, Sets.distance_m, Sets.time_s
+)
 
 
 @dataclass
@@ -41,9 +120,19 @@ class ExerciseStats:
 
 
 class WorkoutInterface:
-    def __init__(self):
-        pass
+    """Interface for reading and writing workouts, exercises and sets.
+
+    Parameters
+    ----------
+    timezone : Optional[str], optional
+        IANA name of the timezone used to decide which local day a set was logged
+        on, e.g. "Europe/London". If not given, the server's local time is used.
+    """
+
+    def __init__(self, timezone: Optional[str] = None):
+        self.timezone = zoneinfo.ZoneInfo(timezone) if timezone else None
 
+    @cached_metadata
     def get_workout_name(self, workoutID: int) -> str:
         """Return workout name from workoutID
 
@@ -57,9 +146,10 @@ class WorkoutInterface:
         str
             Workout name
         """
-        query = Workout.get(Workout.workout_id == workoutID)
+        query = self._get_workout(workoutID)
         return query.name
 
+    @cached_metadata
     def get_workout_colour(self, workoutID: int) -> str:
         """Return hex colour for workout from workoutID
 
@@ -73,9 +163,10 @@ class WorkoutInterface:
         str
             Colour associated with workout
         """
-        query = Workout.get(Workout.workout_id == workoutID)
+        query = self._get_workout(workoutID)
         return query.colour
 
+    @cached_metadata
     def get_exercise_name(self, exerciseID: int) -> str:
         """Return exercise name from exercise ID
 
@@ -89,9 +180,10 @@ class WorkoutInterface:
         str
             Exercise name
         """
-        query = Exercise.get(Exercise.exercise_id == exerciseID)
+        query = self._get_exercise(exerciseID)
         return query.name
 
+    @cached_metadata
     def get_exercise_type(self, exerciseID: int) -> str:
         """Return exercise type from exercise ID
 
@@ -105,7 +197,7 @@ class WorkoutInterface:
         str
             Exercise name
         """
-        query = Exercise.get(Exercise.exercise_id == exerciseID)
+        query = self._get_exercise(exerciseID)
         return query.type_
 
     def list_workouts(self) -> List[Dict[str, Any]]:
@@ -119,25 +211,49 @@ class WorkoutInterface:
                 exercise_count
                 workoutID
                 colour
-                last_update
+                last_update: ISO8601 timestamp of latest set, or None
                 last_exercise
         """
-        workout_data = []
-        # Get list of workouts
-        workouts = Workout.select()
-        for w in workouts:
-            # For each workout, count number of exercises
-            count = (
-                WorkoutExercise.select()
-                .where(WorkoutExercise.workout == w.workout_id)
-                .count()
+        # Count exercises in each workout, including workouts with no exercises
+        workouts = (
+            Workout.select(
+                Workout.workout_id,
+                Workout.name,
+                Workout.colour,
+                fn.COUNT(WorkoutExercise.uid).alias("exercise_count"),
             )
+            .join(WorkoutExercise, JOIN.LEFT_OUTER)
+            .group_by(Workout.workout_id)
+            .order_by(Workout.workout_id)
+        )
 
-            exercise, update = self._get_workout_last_update(w.workout_id)
+        # Most recent set across all exercises in each workout, from the latest set
+        # of each exercise. SQLite returns the bare timestamp and exercise name from
+        # the row that contains the MAX
+        latest = (
+            WorkoutExercise.select(
+                WorkoutExercise.workout,
+                fn.MAX(Sets.epoch_s),
+                Sets.datetime,
+                Exercise.name,
+            )
+            .join(Sets, on=(Sets.uid == self._latest_set_uid(WorkoutExercise.exercise)))
+            .switch(WorkoutExercise)
+            .join(Exercise)
+            .group_by(WorkoutExercise.workout)
+            .tuples()
+        )
+        last_updates = {
+            workoutID: (exercise, update) for workoutID, _, update, exercise in latest
+        }
+
+        workout_data = []
+        for w in workouts:
+            exercise, update = last_updates.get(w.workout_id, ("", None))
             workout_data.append(
                 {
                     "name": w.name,
-                    "exercise_count": count,
+                    "exercise_count": w.exercise_count,
                     "workoutID": w.workout_id,
                     "colour": w.colour,
                     "last_update": update,
@@ -147,6 +263,7 @@ class WorkoutInterface:
 
         return workout_data
 
+    @cached_metadata
     def list_all_exercises(self) -> List[Dict[str, str]]:
         """Return all exercises in database
 
@@ -162,6 +279,28 @@ class WorkoutInterface:
         ]
         return sorted(all_exercises, key=lambda x: x["name"])
 
+    @cached_metadata
+    def list_workout_exercise_names(self, workoutID: int) -> List[str]:
+        """Return names of exercises in workout given by workoutID
+
+        Parameters
+        ----------
+        workoutID : int
+            Workout ID
+
+        Returns
+        -------
+        List[str]
+            Exercise names
+        """
+        exercises = (
+            Exercise.select(Exercise.name)
+            .join(WorkoutExercise)
+            .where(WorkoutExercise.workout == workoutID)
+            .tuples()
+        )
+        return [name for (name,) in exercises]
+
     def list_workout_exercises(self, workoutID: int) -> List[Dict[str, str]]:
         """Return exercises for workout given by workoutID
 
@@ -173,33 +312,50 @@ class WorkoutInterface:
         Returns
         -------
         List[Dict[str, str]]
-            List of dicts containing name, exerciseID, last update
-            and last set details
+            List of dicts containing name, exerciseID, last update (ISO8601
+            timestamp of latest set, or None) and last set details
         """
+        # Join each exercise to its most recent set, found with an index seek
+        exercises = (
+            WorkoutExercise.select(
+                Exercise.exercise_id,
+                Exercise.name,
+                Sets.uid,
+                Sets.datetime,
+                Sets.distance_m,
+                Sets.weight_kg,
+                Sets.time_s,
+                Sets.repetitions,
+            )
+            .join(Exercise)
+            .switch(WorkoutExercise)
+            .join(
+                Sets,
+                JOIN.LEFT_OUTER,
+                on=(Sets.uid == self._latest_set_uid(WorkoutExercise.exercise)),
+            )
+            .where(WorkoutExercise.workout == workoutID)
+            .dicts()
+        )
+
         exercise_data = []
-        exercises = WorkoutExercise.select().where(WorkoutExercise.workout == workoutID)
         for e in exercises:
-
-            query = Exercise.get(Exercise.exercise_id == e.exercise)
-            set_ = self.get_exercise_last_set(e.exercise)
-
-            if set_.repetitions is not None and set_.weight_kg is not None:
-                set_string = f"{set_.repetitions} x {set_.weight_kg} kg"
-            elif set_.distance_m is not None and set_.time_s is not None:
-                time_string = str(datetime.timedelta(seconds=int(set_.time_s)))[2:]
-                set_string = f"{set_.distance_m / 1000:.2f} km / {time_string}"
-            elif set_.time_s is not None:
-                set_string = f"{set_.time_s} s"
-            else:
-                set_string = ""
+            # Exercises with no sets yet have no matching set
+            set_ = ExerciseSet(
+                e["uid"] or 0,
+                e["datetime"] or "",
+                e["distance_m"],
+                e["weight_kg"],
+                e["time_s"],
+                e["repetitions"],
+            )
 
             exercise_data.append(
                 {
-                    "name": query.name,
-                    "exerciseID": query.exercise_id,
-                    "last_update": self._readable_datetime(set_.datetime),
-                    "is_today": self._timestamp_is_today(set_.datetime),
-                    "last_set": set_string,
+                    "name": e["name"],
+                    "exerciseID": e["exercise_id"],
+                    "last_update": e["datetime"],
+                    "last_set": self._create_set_summary(set_),
                 }
             )
 
@@ -207,8 +363,7 @@ class WorkoutInterface:
         return sorted(exercise_data, key=lambda x: x["name"])
 
     def list_todays_exercise_sets(self, exerciseID: int) -> List[Dict[str, Any]]:
-        """Get list of most recent sets limited by <number> for exercise.
-        Sets are grouped by date.
+        """Get list of sets logged today for exercise, in local time.
 
         Parameters
         ----------
@@ -218,186 +373,348 @@ class WorkoutInterface:
         Returns
         -------
         List[Dict[str, Any]]
-            List of dicts containing set timestamp and detail.
+            List of dicts containing set timestamp and detail, most recent first.
         """
-        set_data = []
+        today_start, today_end = self._local_day_bounds(self.today())
+        return self.list_exercise_sets_between(exerciseID, today_start, today_end)
+
+    def list_exercise_sets_between(
+        self, exerciseID: int, since: int, until: int
+    ) -> List[Dict[str, Any]]:
+        """Get list of sets for exercise logged between since and until.
+
+        Each set includes the change from the set before it, which may have been
+        logged before since.
+
+        Parameters
+        ----------
+        exerciseID : int
+            Exercise ID
+        since : int
+            Start of window, seconds since unix epoch (inclusive)
+        until : int
+            End of window, seconds since unix epoch (exclusive)
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            List of dicts containing set timestamp and detail, most recent first.
+        """
+        in_window = (
+            (Sets.exercise == exerciseID)
+            & (Sets.epoch_s >= since)
+            & (Sets.epoch_s < until)
+        )
+        # Pair each set with the set before it for the exercise. The window only
+        # needs to start at the set before the first set in the window, rather than
+        # scanning the whole history of the exercise.
+        # Grouping stops SQLite answering MIN() by walking the (exerciseID, uid)
+        # index from the oldest set, so the (exerciseID, epoch_s) index is used
+        first_uid = (
+            Sets.select(fn.MIN(Sets.uid)).where(in_window).group_by(Sets.exercise)
+        )
+        previous_uid = Sets.select(fn.MAX(Sets.uid)).where(
+            (Sets.exercise == exerciseID) & (Sets.uid < first_uid)
+        )
+        window = {"partition_by": [Sets.exercise], "order_by": [Sets.uid]}
+        lagged_sets = (
+            Sets.select(
+                Sets.uid,
+                Sets.datetime,
+                Sets.epoch_s,
+                Sets.distance_m,
+                Sets.weight_kg,
+                Sets.time_s,
+                Sets.repetitions,
+                fn.LAG(Sets.uid).over(**window).alias("prev_uid"),
+                fn.LAG(Sets.datetime).over(**window).alias("prev_datetime"),
+                fn.LAG(Sets.distance_m).over(**window).alias("prev_distance_m"),
+                fn.LAG(Sets.weight_kg).over(**window).alias("prev_weight_kg"),
+                fn.LAG(Sets.time_s).over(**window).alias("prev_time_s"),
+                fn.LAG(Sets.repetitions).over(**window).alias("prev_repetitions"),
+            )
+            .where(
+                (Sets.exercise == exerciseID)
+                & (Sets.uid >= fn.COALESCE(previous_uid, first_uid))
+            )
+            .alias("lagged_sets")
+        )
         sets = (
-            Sets.select()
-            .where(Sets.exercise == exerciseID)
-            .order_by(Sets.uid.desc())
-            .limit(15)  # Assume no more than 15 sets per day ever
+            Sets.select(
+                lagged_sets.c.uid,
+                lagged_sets.c.datetime,
+                lagged_sets.c.distance_m,
+                lagged_sets.c.weight_kg,
+                lagged_sets.c.time_s,
+                lagged_sets.c.repetitions,
+                lagged_sets.c.prev_uid,
+                lagged_sets.c.prev_datetime,
+                lagged_sets.c.prev_distance_m,
+                lagged_sets.c.prev_weight_kg,
+                lagged_sets.c.prev_time_s,
+                lagged_sets.c.prev_repetitions,
+            )
+            .from_(lagged_sets)
+            .where((lagged_sets.c.epoch_s >= since) & (lagged_sets.c.epoch_s < until))
+            .order_by(lagged_sets.c.uid.desc())
+            .dicts()
         )
-        for s in sets:
-            if not self._timestamp_is_today(s.datetime):
-                continue
 
+        set_data = []
+        for s in sets:
             current_set = ExerciseSet(
-                s.uid, s.datetime, s.distance_m, s.weight_kg, s.time_s, s.repetitions
+                s["uid"],
+                s["datetime"],
+                s["distance_m"],
+                s["weight_kg"],
+                s["time_s"],
+                s["repetitions"],
             )
-            set_string = self._create_set_summary(current_set)
-
-            previous_set = self._get_previous_set(exerciseID, s.uid)
-            if previous_set is not None:
-                delta = self._calculate_set_delta(current_set, previous_set)
-            else:
-                delta = None
-
-            # Convert time (seconds) to hours, minutes and seconds
-            if s.time_s is not None:
-                hours = math.floor(float(s.time_s) / 3600) or None
-                mins = math.floor((float(s.time_s) % 3600) / 60) or None
-                seconds = math.floor(float(s.time_s) % 60) or None
+            if s["prev_uid"] is not None:
+                previous_set = ExerciseSet(
+                    s["prev_uid"],
+                    s["prev_datetime"],
+                    s["prev_distance_m"],
+                    s["prev_weight_kg"],
+                    s["prev_time_s"],
+                    s["prev_repetitions"],
+                )
             else:
-                hours = None
-                mins = None
-                seconds = None
+                previous_set = None
 
-            set_data.append(
-                {
-                    "uid": s.uid,
-                    "timestamp": s.datetime,
-                    "readable_time": self._readable_datetime(s.datetime),
-                    "set_detail": set_string,
-                    "distance": s.distance_m,
-                    "weight": s.weight_kg,
-                    "hours": hours,
-                    "mins": mins,
-                    "seconds": seconds,
-                    "repetitions": s.repetitions,
-                    "delta": delta,
-                }
-            )
+            set_data.append(self._set_details(current_set, previous_set))
 
         return set_data
 
-    def get_exercise_history(
-        self, exerciseID: int, num_sets: int = 25
-    ) -> Dict[int, List[Tuple[str, str]]]:
-        """Get historical sets for this exercise going back `period_days`.
+    def list_exercise_sets_page(
+        self, exerciseID: int, before: Optional[int] = None, limit: int = 50
+    ) -> Dict[str, Any]:
+        """Get a page of sets for exercise, most recent first.
+
+        Pages are found by seeking the (exerciseID, uid) index to the set before the
+        last set of the previous page, so each page costs the same however far back
+        in the history it is.
 
         Parameters
         ----------
         exerciseID : int
             Exercise ID
-        num_sets : int, optional
-            Number of sets to include
+        before : Optional[int], optional
+            Return sets with a uid less than this. If not given, start from the most
+            recent set.
+        limit : int, optional
+            Maximum number of sets to return
 
         Returns
         -------
-        Dict[int, List[Tuple[str, str]]]
-            Dict.
-            The key is the number of days ago the set was logged.
-            The value is a list of tuple of (scaled value, value)
-                For weight-repetition exercises, the value is weight*repetition
-                For distance-time exercises, the value is distance/time
-                For time exercises, the value is time
+        Dict[str, Any]
+            Dict containing
+                sets: list of dicts containing set timestamp and detail
+                next_before: value of before for the next page, or None if this is
+                the last page
         """
-        exercise_type = self.get_exercise_type(exerciseID)
+        query = Sets.select(
+            Sets.uid,
+            Sets.datetime,
+            Sets.distance_m,
+            Sets.weight_kg,
+            Sets.time_s,
+            Sets.repetitions,
+        ).where(Sets.exercise == exerciseID)
+        if before is not None:
+            query = query.where(Sets.uid < before)
+
+        # The extra set is the previous set of the last set on the page, and shows
+        # whether there are more pages
+        rows = [
+            ExerciseSet(*row)
+            for row in query.order_by(Sets.uid.desc()).limit(limit + 1).tuples()
+        ]
+        page = rows[:limit]
+        set_data = [
+            self._set_details(current_set, previous_set)
+            for current_set, previous_set in zip(page, rows[1:] + [None])
+        ]
 
-        data = {}
-        max_value = 0
-        min_value = 1e6
+        return {
+            "sets": set_data,
+            "next_before": page[-1].uid if len(rows) > limit else None,
+        }
 
-        sets = (
-            Sets.select()
-            .where(Sets.exercise == exerciseID)
-            .order_by(Sets.datetime.desc())
+    def iter_sets_for_export(self) -> Iterator[Tuple[Any, ...]]:
+        """Iterate over every set, joined with the name and type of its exercise, in
+        the order they were logged.
+
+        Rows are read from the database cursor as they are iterated over, instead of
+        being loaded into memory all at once.
+
+        Returns
+        -------
+        Iterator[Tuple[Any, ...]]
+            Tuple of values for each set, in the same order as EXPORT_COLUMNS
+        """
+        return (
+            Sets.select(
+                Sets.uid,
+                Sets.uuid,
+                Sets.datetime,
+                Exercise.name,
+                Exercise.type_,
+                Sets.distance_m,
+                Sets.weight_kg,
+                Sets.repetitions,
+                Sets.time_s,
+            )
+            .join(Exercise)
+            .order_by(Sets.uid)
+            .tuples()
+            .iterator()
         )
-        if exercise_type == "weight-repetitions":
-            for s in sets:
-                time_delta = self._parse_timestamp(s.datetime) - datetime.datetime.now(
-                    datetime.timezone.utc
-                )
 
-                if time_delta.days in data.keys():
-                    data[time_delta.days].append(
-                        {
-                            "value": s.weight_kg * s.repetitions,
-                            "today": self._timestamp_is_today(s.datetime),
-                        }
-                    )
-                else:
-                    data[time_delta.days] = [
-                        {
-                            "value": s.weight_kg * s.repetitions,
-                            "today": self._timestamp_is_today(s.datetime),
-                        }
-                    ]
+    def list_changes(self, since: int = 0, limit: int = 500) -> Dict[str, Any]:
+        """List the exercises, workouts and sets that have changed since the change
+        log sequence number `since`, so a client can update its copy of them.
 
-                max_value = max(max_value, s.weight_kg * s.repetitions)
-                min_value = min(min_value, s.weight_kg * s.repetitions)
+        The next `limit` entries of the change log are read in order, so each page
+        costs the same however long the log is. Each entity changed by these entries
+        is listed once, with its current values, or as deleted if it no longer
+        exists. An entity that changes again later is listed again in a later page.
 
-                if len(data.keys()) == num_sets:
-                    break
+        Parameters
+        ----------
+        since : int, optional
+            Sequence number of the last change the client has, 0 for everything
+        limit : int, optional
+            Maximum number of change log entries to read
 
-        elif exercise_type == "distance-time":
-            for s in sets:
-                time_delta = self._parse_timestamp(s.datetime) - datetime.datetime.now(
-                    datetime.timezone.utc
+        Returns
+        -------
+        Dict[str, Any]
+            Dict with the following keys
+                changes: list of dicts with the keys seq, entity, id, op ("upsert"
+                    or "delete") and data, which is only included for upserts
+                next: sequence number to use as since for the next request
+                more: true if there are more changes after this page
+        """
+        # Read the log and the changed rows in one transaction, so they are
+        # consistent with each other
+        with database.atomic():
+            entries = list(
+                ChangeLog.select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id)
+                .where(ChangeLog.seq > since)
+                .order_by(ChangeLog.seq)
+                .limit(limit + 1)
+                .tuples()
+            )
+            page = entries[:limit]
+
+            # Sequence number of the last change to each entity in the page
+            latest = {(entity, entityID): seq for seq, entity, entityID in page}
+            data = {
+                entity: self._get_change_data(
+                    entity, [entityID for e, entityID in latest if e == entity]
                 )
+                for entity in CHANGE_ENTITIES
+            }
+
+        changes = []
+        for (entity, entityID), seq in sorted(latest.items(), key=lambda x: x[1]):
+            row = data[entity].get(entityID)
+            change = {
+                "seq": seq,
+                "entity": entity,
+                "id": entityID,
+                "op": "delete" if row is None else "upsert",
+            }
+            if row is not None:
+                change["data"] = row
+            changes.append(change)
+
+        return {
+            "changes": changes,
+            "next": page[-1][0] if page else since,
+            "more": len(entries) > limit,
+        }
 
-                if time_delta.days in data.keys():
-                    data[time_delta.days].append(
-                        {
-                            "value": s.distance_m / s.time_s,
-                            "today": self._timestamp_is_today(s.datetime),
-                        }
-                    )
-                else:
-                    data[time_delta.days] = [
-                        {
-                            "value": s.distance_m / s.time_s,
-                            "today": self._timestamp_is_today(s.datetime),
-                        }
-                    ]
+    def get_exercise_history(
+        self, exerciseID: int, num_sets: int = 25
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Get historical sets for this exercise from the most recent `num_sets` days
+        that have sets.
 
-                max_value = max(max_value, s.distance_m / s.time_s)
-                min_value = min(min_value, s.distance_m / s.time_s)
+        Parameters
+        ----------
+        exerciseID : int
+            Exercise ID
+        num_sets : int, optional
+            Number of days to include
 
-                if len(data.keys()) == num_sets:
-                    break
+        Returns
+        -------
+        Dict[str, List[Dict[str, Any]]]
+            Dict.
+            The key is the local date the set was logged, in ISO8601 format.
+            The value is a list of dicts of scaled value and value
+                For weight-repetition exercises, the value is weight*repetition
+                For distance-time exercises, the value is distance/time
+                For time exercises, the value is time
+        """
+        exercise_type = self.get_exercise_type(exerciseID)
+        value = HISTORY_VALUES[exercise_type]
 
-        elif exercise_type == "time":
-            for s in sets:
-                time_delta = self._parse_timestamp(s.datetime) - datetime.datetime.now(
-                    datetime.timezone.utc
-                )
+        # Find the start of the earliest of the most recent `num_sets` local calendar
+        # days with sets, stepping back one day at a time from the most recent set.
+        # Each step is a single seek on the (exerciseID, epoch_s) index.
+        to_local, from_local = self._sqlite_local_modifiers()
 
-                if time_delta.days in data.keys():
-                    data[time_delta.days].append(
-                        {
-                            "value": s.time_s,
-                            "today": self._timestamp_is_today(s.datetime),
-                        }
-                    )
-                else:
-                    data[time_delta.days] = [
-                        {
-                            "value": s.time_s,
-                            "today": self._timestamp_is_today(s.datetime),
-                        }
-                    ]
+        def day_start(epoch):
+            return fn.strftime(
+                "%s", fn.date(epoch, "unixepoch", to_local), from_local
+            ).cast("INTEGER")
 
-                max_value = max(max_value, s.time_s)
-                min_value = min(min_value, s.time_s)
+        base = (
+            Sets.select(day_start(fn.MAX(Sets.epoch_s)), Value(1))
+            .where(Sets.exercise == exerciseID)
+            .cte("recent_days", recursive=True, columns=("day_start", "n"))
+        )
+        previous_day = Sets.select(day_start(fn.MAX(Sets.epoch_s))).where(
+            (Sets.exercise == exerciseID) & (Sets.epoch_s < base.c.day_start)
+        )
+        recursive = Select([base], [previous_day, base.c.n + 1]).where(
+            base.c.day_start.is_null(False) & (base.c.n < num_sets)
+        )
+        recent_days = base.union_all(recursive)
+        cutoff = recent_days.select_from(fn.MIN(recent_days.c.day_start))
 
-                if len(data.keys()) == num_sets:
-                    break
+        # Local calendar day each set was logged on
+        day = fn.date(Sets.epoch_s, "unixepoch", to_local)
 
         # Calculate a scaled value, offset so zero is at the 0.9*min_value,
         # then normalise. This is to better show the delta between sets
+        min_value = fn.MIN(value).over() * 0.9
+        max_value = fn.MAX(value).over() * 1.06
+        sets = (
+            Sets.select(
+                day.alias("day"),
+                value.alias("value"),
+                ((value - min_value) / (max_value - min_value)).alias("scaled"),
+            )
+            .where((Sets.exercise == exerciseID) & (Sets.epoch_s >= cutoff))
+            .order_by(Sets.epoch_s.desc())
+            .tuples()
+        )
+
         # Format the value to 3 significant figures for diplay purposes tooltips
-        max_value = max_value * 1.06
-        min_value = min_value * 0.9
-        for k, values in data.items():
-            data[k] = [
+        data = {}
+        for set_day, set_value, scaled in sets:
+            if set_day not in data:
+                data[set_day] = []
+            data[set_day].append(
                 {
-                    "scaled": f"{(v['value'] - min_value) / (max_value - min_value):.2g}",
-                    "value": f"{v['value']:.3g}",
-                    "today": v["today"],
+                    "scaled": f"{scaled or 0:.2g}",
+                    "value": f"{set_value:.3g}",
                 }
-                for v in values
-            ]
+            )
 
         return data
 
@@ -415,23 +732,20 @@ class WorkoutInterface:
             ExerciseStats object for exercise
         """
         exercise_type = self.get_exercise_type(exerciseID)
+        stats = self._get_exercise_statistics(exerciseID)
 
-        sets = (
-            Sets.select()
-            .where(Sets.exercise == exerciseID)
-            .order_by(Sets.datetime.desc())
-        )
         # Exercise has not sets yet
-        if not sets:
+        if stats.latest_uid is None:
             return ExerciseStats("", "", "", "", "")
 
+        latest = stats.latest_set
         latest_set = ExerciseSet(
-            sets[0].uid,
-            sets[0].datetime,
-            sets[0].distance_m,
-            sets[0].weight_kg,
-            sets[0].time_s,
-            sets[0].repetitions,
+            latest.uid,
+            latest.datetime,
+            latest.distance_m,
+            latest.weight_kg,
+            latest.time_s,
+            latest.repetitions,
         )
         latest = self._create_set_summary(latest_set)
         recent = self._parse_timestamp(latest_set.datetime).strftime("%d %b")
@@ -440,43 +754,37 @@ class WorkoutInterface:
             rep_max = self._calculate_one_rep_max(
                 latest_set.weight_kg, latest_set.repetitions
             )
-            total = sum(
-                s.weight_kg * s.repetitions
-                for s in sets
-                if self._timestamp_is_within_year(s.datetime)
-            )
+            total = stats.year_total
 
             return ExerciseStats(
                 f"{rep_max:.1f} kg", "1 rep max", recent, latest, f"{total:,g} kg"
             )
 
         elif exercise_type == "distance-time":
-
-            total = (
-                sum(
-                    s.distance_m
-                    for s in sets
-                    if self._timestamp_is_within_year(s.datetime)
-                )
-                / 1000
-            )
+            total = stats.year_total / 1000
             speed = latest_set.distance_m / latest_set.time_s
 
             return ExerciseStats(
                 f"{speed:.1f} m/s", "Speed", recent, latest, f"{total:,.2f} km"
             )
         elif exercise_type == "time":
-            total_seconds = sum(
-                s.time_s for s in sets if self._timestamp_is_within_year(s.datetime)
-            )
+            total_seconds = stats.year_total
             total_seconds_str = str(datetime.timedelta(seconds=int(total_seconds)))
 
-            rep_max = max(s.time_s for s in sets)
+            rep_max = stats.max_time_s
 
             return ExerciseStats(
                 f"{rep_max:.1f} s", "Longest", recent, latest, total_seconds_str
             )
 
+    def rebuild_exercise_stats(self) -> None:
+        """Recalculate the stored statistics for every exercise from its sets."""
+        with database.atomic("IMMEDIATE"):
+            ExerciseStatistics.delete().execute()
+            for exercise in Exercise.select(Exercise.exercise_id):
+                self._refresh_exercise_stats(exercise.exercise_id)
+            invalidate_pages()
+
     def save_set(self, post_data: Dict[str, str]) -> None:
         """Save new set to database
 
@@ -484,30 +792,81 @@ class WorkoutInterface:
         ----------
         post_data : Dict[str, str]
             Data sent by client
+
+        Raises
+        ------
+        ValueError
+            If the set data is invalid
         """
-        # Create fallback timestamp in iso format, without milliseconds
-        fallback_timestamp = (
-            datetime.datetime.now(datetime.timezone.utc).isoformat().split(".")[0] + "Z"
-        )
+        with database.atomic("IMMEDIATE"):
+            new = Sets.create(**self._set_row_from_post_data(post_data))
+            self._add_set_to_exercise_stats(new.uid)
+            self._log_changes("set", [new.uid], "upsert")
+            invalidate_pages()
 
-        # Convert time from hours, minutes, seconds into total seconds
-        time = None
-        hours = post_data.get("hours", None)
-        mins = post_data.get("mins", None)
-        secs = post_data.get("secs", None)
-        if hours is not None and mins is not None and secs is not None:
-            time = int(secs or 0) + 60 * int(mins or 0) + 3600 * int(hours or 0)
+    def save_sets(self, sets: List[Dict[str, str]]) -> List[int]:
+        """Save new sets to database, in a single transaction and INSERT statement.
 
-        new = Sets.create(
-            datetime=post_data.get("timestamp", fallback_timestamp),
-            distance_m=post_data.get("distance", None),
-            exercise=post_data.get("exerciseID", None),
-            repetitions=post_data.get("reps", None),
-            time_s=time,
-            weight_kg=post_data.get("weight", None),
-            uuid=post_data.get("uuid", uuid.uuid4()),
-        )
-        new.save()
+        Sets with the same UUID as an existing set are ignored, so a client can safely
+        retry a batch that may already have been saved.
+
+        Parameters
+        ----------
+        sets : List[Dict[str, str]]
+            List of data for each set, in the same format as sent by the client for
+            save_set
+
+        Returns
+        -------
+        List[int]
+            Unique ID of each set, in the same order as sets. For sets that were
+            ignored, this is the uid of the existing set with the same UUID.
+
+        Raises
+        ------
+        ValueError
+            If the data for any set is invalid, in which case no sets are saved
+        """
+        if not sets:
+            return []
+
+        rows = [self._set_row_from_post_data(set_) for set_ in sets]
+        with database.atomic("IMMEDIATE"):
+            # Statistics that aren't stored yet are calculated from every set after
+            # the insert, so the new sets are only added to statistics that exist
+            stored = {
+                exerciseID
+                for (exerciseID,) in ExerciseStatistics.select(
+                    ExerciseStatistics.exercise
+                )
+                .where(
+                    ExerciseStatistics.exercise.in_({row["exercise"] for row in rows})
+                )
+                .tuples()
+            }
+            query = (
+                Sets.insert_many(rows)
+                .on_conflict(conflict_target=[Sets.uuid], action="NOTHING")
+                .returning(Sets.uuid, Sets.uid, Sets.exercise)
+                .tuples()
+            )
+            inserted = {uuid_: (uid, exerciseID) for uuid_, uid, exerciseID in query}
+            for uid, exerciseID in sorted(inserted.values()):
+                if exerciseID in stored:
+                    self._add_set_to_exercise_stats(uid)
+            for exerciseID in {exerciseID for _, exerciseID in inserted.values()}:
+                if exerciseID not in stored:
+                    self._refresh_exercise_stats(exerciseID)
+
+            if inserted:
+                new_uids = sorted(uid for uid, _ in inserted.values())
+                self._log_changes("set", new_uids, "upsert")
+                invalidate_pages()
+
+        if len(inserted) == len(rows):
+            return [inserted[row["uuid"]][0] for row in rows]
+
+        return self._get_set_uids([row["uuid"] for row in rows])
 
     def delete_set(self, uid: int) -> None:
         """Delete set given by set uid
@@ -517,8 +876,12 @@ class WorkoutInterface:
         uid : int
             Set unique ID
         """
-        set_ = Sets.get(Sets.uid == uid)
-        set_.delete_instance()
+        with database.atomic("IMMEDIATE"):
+            set_ = Sets.get(Sets.uid == uid)
+            set_.delete_instance()
+            self._refresh_exercise_stats(set_.exerciseID)
+            self._log_changes("set", [uid], "delete")
+            invalidate_pages()
 
     def update_set(self, uid: int, data: Dict[str, str]) -> None:
         """Update set with new data.
@@ -533,6 +896,7 @@ class WorkoutInterface:
             exercise type are in the dict.
         """
         set_ = Sets.get(Sets.uid == uid)
+        set_.epoch_s = self._timestamp_to_epoch(set_.datetime)
         set_.distance_m = data.get("distance_m", None)
         set_.weight_kg = data.get("weight_kg", None)
         set_.repetitions = data.get("repetitions", None)
@@ -551,24 +915,200 @@ class WorkoutInterface:
 
             set_.time_s = seconds
 
-        set_.save()
+        with database.atomic("IMMEDIATE"):
+            set_.save()
+            self._refresh_exercise_stats(set_.exerciseID)
+            self._log_changes("set", [uid], "upsert")
+            invalidate_pages()
 
-    def sync_sets(self, offline_sets: list[dict[str, str]]) -> None:
+    def sync_sets(
+        self, offline_sets: List[Dict[str, str]], chunk_size: int = 100
+    ) -> Dict[str, List[str]]:
         """Sync sets saved offline to database.
 
         New sets are added to sets table. Any new sets with duplicate UUID are ignored.
+        Sets that can't be saved, because their data is invalid or their exercise
+        doesn't exist, e.g. it was deleted while the client was offline, are rejected
+        without affecting the other sets.
+        All sets are inserted in a single transaction, `chunk_size` sets per INSERT
+        statement.
 
         Parameters
         ----------
-        offline_sets : list[dict[str, str]]
+        offline_sets : List[Dict[str, str]]
             List of sets saved offline
+        chunk_size : int, optional
+            Number of sets to insert per statement
+
+        Returns
+        -------
+        Dict[str, List[str]]
+            Dict with the following keys
+                inserted: UUIDs of sets added to the database
+                duplicates: UUIDs of sets ignored because they already exist
+                rejected: UUIDs of sets that can't be saved
         """
+        result = {"inserted": [], "duplicates": [], "rejected": []}
+        rows = []
         for set_ in offline_sets:
+            if not isinstance(set_, dict):
+                continue
             try:
-                self.save_set(set_)
-            except IntegrityError:
-                # Database constraint violated, probably due to duplicate UUID
-                pass
+                row = self._set_row_from_post_data(set_)
+                row["exercise"] = int(row["exercise"])
+            except (TypeError, ValueError):
+                result["rejected"].append(set_.get("uuid"))
+                continue
+            rows.append(row)
+
+        with database.atomic("IMMEDIATE"):
+            # Checked in the transaction, so exercises can't be deleted before the
+            # sets are inserted
+            exerciseIDs = {
+                exerciseID
+                for (exerciseID,) in Exercise.select(Exercise.exercise_id)
+                .where(Exercise.exercise_id.in_({row["exercise"] for row in rows}))
+                .tuples()
+            }
+            result["rejected"].extend(
+                row["uuid"] for row in rows if row["exercise"] not in exerciseIDs
+            )
+            rows = [row for row in rows if row["exercise"] in exerciseIDs]
+
+            for i in range(0, len(rows), chunk_size):
+                chunk = rows[i : i + chunk_size]
+                query = (
+                    Sets.insert_many(chunk)
+                    .on_conflict(conflict_target=[Sets.uuid], action="NOTHING")
+                    .returning(Sets.uuid, Sets.uid)
+                    .tuples()
+                )
+                inserted = dict(query.execute())
+                self._log_changes("set", sorted(inserted.values()), "upsert")
+
+                for row in chunk:
+                    if row["uuid"] in inserted:
+                        result["inserted"].append(row["uuid"])
+                        # Any later set in the chunk with the same UUID was ignored
+                        del inserted[row["uuid"]]
+                    else:
+                        result["duplicates"].append(row["uuid"])
+
+            for exerciseID in {row["exercise"] for row in rows}:
+                self._refresh_exercise_stats(exerciseID)
+
+            if result["inserted"]:
+                invalidate_pages()
+
+        return result
+
+    def import_sets(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: int = 10000,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """Import sets, for example from an export of this or another tracker.
+
+        Each row has the same keys as the export, see EXPORT_COLUMNS. Exercises are
+        matched by name and created if they don't exist, in which case
+        exercise_type is required. Rows without the values needed for their exercise
+        type are skipped. Sets with the same UUID as an existing set are ignored.
+        Rows without a UUID are given one derived from their content, so importing
+        the same file twice doesn't duplicate sets.
+
+        Rows are read as they are imported and inserted `chunk_size` at a time, each
+        chunk in its own transaction, so other requests can write between chunks. If
+        reading the rows raises an exception, the chunks inserted before it are kept.
+
+        Parameters
+        ----------
+        rows : Iterable[Dict[str, Any]]
+            Sets to import
+        chunk_size : int, optional
+            Number of sets to insert per transaction
+        progress : Optional[Callable[[Dict[str, Any]], None]], optional
+            Function called with the current result after each chunk
+
+        Returns
+        -------
+        Dict[str, Any]
+            Dict with the following keys
+                rows: number of rows read
+                inserted: number of sets added to the database
+                duplicates: number of sets ignored because they already exist
+                invalid: number of rows skipped because they are invalid
+                exercises_created: names of exercises created
+                errors: messages for the first MAX_IMPORT_ERRORS invalid rows
+        """
+        result = {
+            "rows": 0,
+            "inserted": 0,
+            "duplicates": 0,
+            "invalid": 0,
+            "exercises_created": [],
+            "errors": [],
+        }
+        exercises = {
+            name: (exerciseID, exercise_type)
+            for exerciseID, name, exercise_type in Exercise.select(
+                Exercise.exercise_id, Exercise.name, Exercise.type_
+            ).tuples()
+        }
+        exerciseIDs = set()
+
+        def insert_chunk(chunk: List[Tuple[Any, ...]]) -> None:
+            with database.atomic("IMMEDIATE"):
+                last_uid = Sets.select(fn.MAX(Sets.uid)).scalar() or 0
+                inserted = self._insert_set_rows(chunk)
+                if inserted:
+                    # New sets are given uids after the largest existing uid
+                    self._log_changes(
+                        "set",
+                        Sets.select(Sets.uid).where(Sets.uid > last_uid),
+                        "upsert",
+                    )
+                    invalidate_pages()
+
+            result["inserted"] += inserted
+            result["duplicates"] += len(chunk) - inserted
+            if progress is not None:
+                progress(result)
+
+        chunk = []
+        try:
+            for row_number, row in enumerate(rows, start=1):
+                result["rows"] += 1
+                try:
+                    set_row = self._set_row_from_import(row, exercises, result)
+                except (KeyError, TypeError, ValueError) as e:
+                    result["invalid"] += 1
+                    if len(result["errors"]) < MAX_IMPORT_ERRORS:
+                        result["errors"].append(f"Row {row_number}: {e}")
+                    continue
+
+                chunk.append(set_row)
+                exerciseIDs.add(set_row[3])
+                if len(chunk) == chunk_size:
+                    insert_chunk(chunk)
+                    chunk = []
+
+            if chunk:
+                insert_chunk(chunk)
+        finally:
+            # Earlier chunks and created exercises are already committed if reading
+            # the rows fails part way through, so update the statistics and caches
+            # for them either way
+            with database.atomic("IMMEDIATE"):
+                for exerciseID in exerciseIDs:
+                    self._refresh_exercise_stats(exerciseID)
+
+                if result["exercises_created"]:
+                    invalidate_metadata()
+                elif exerciseIDs:
+                    invalidate_pages()
+
+        return result
 
     def save_workout(self, workoutID: int, workout_data: Dict[str, Any]) -> None:
         """Save changes to workout
@@ -580,27 +1120,34 @@ class WorkoutInterface:
         workout_data : Dict[str, Any]
             Dict containing latest workout name and exercise list
         """
-        workout = Workout.get(Workout.workout_id == workoutID)
-        workout.name = workout_data["name"]
-        workout.save()
+        with database.atomic("IMMEDIATE"):
+            workout = Workout.get(Workout.workout_id == workoutID)
+            workout.name = workout_data["name"]
+            workout.save()
+
+            # Get set of current exercise IDs
+            current_exercises = WorkoutExercise.select(WorkoutExercise.exercise).where(
+                WorkoutExercise.workout == workoutID
+            )
+            current_exercise_IDs = {ex.exerciseID for ex in current_exercises}
 
-        # Get set of current exercise IDs
-        current_exercises = self.list_workout_exercises(workoutID)
-        current_exercise_IDs = {ex["exerciseID"] for ex in current_exercises}
+            new_exercises = set(workout_data["exerciseIDs"]) - current_exercise_IDs
+            deleted_exercises = current_exercise_IDs - set(workout_data["exerciseIDs"])
 
-        new_exercises = set(workout_data["exerciseIDs"]) - current_exercise_IDs
-        deleted_exercises = current_exercise_IDs - set(workout_data["exerciseIDs"])
+            for exerciseID in new_exercises:
+                new = WorkoutExercise.create(workout=workoutID, exercise=exerciseID)
+                new.save()
 
-        for exerciseID in new_exercises:
-            new = WorkoutExercise.create(workout=workoutID, exercise=exerciseID)
-            new.save()
+            for exerciseID in deleted_exercises:
+                delete = WorkoutExercise.get(
+                    WorkoutExercise.workout == workoutID,
+                    WorkoutExercise.exercise == exerciseID,
+                )
+                delete.delete_instance()
 
-        for exerciseID in deleted_exercises:
-            delete = WorkoutExercise.get(
-                WorkoutExercise.workout == workoutID,
-                WorkoutExercise.exercise == exerciseID,
-            )
-            delete.delete_instance()
+            self._log_changes("workout", [workoutID], "upsert")
+            invalidate_metadata()
+        self._clear_entity_cache()
 
     def new_exercise(self, name: str, exercise_type: str) -> None:
         """Add new exercise to database
@@ -612,8 +1159,10 @@ class WorkoutInterface:
         exercise_type : str
             Type of exercise
         """
-        new = Exercise.create(name=name, type_=exercise_type)
-        new.save()
+        with database.atomic("IMMEDIATE"):
+            new = Exercise.create(name=name, type_=exercise_type)
+            self._log_changes("exercise", [new.exercise_id], "upsert")
+            invalidate_metadata()
 
     def delete_exercise(self, exerciseID: int) -> None:
         """Delete exercise given by set exerciseID.
@@ -626,7 +1175,27 @@ class WorkoutInterface:
             Exercise ID
         """
         exercise = Exercise.get(Exercise.exercise_id == exerciseID)
-        exercise.delete_instance(recursive=True)
+        # Recursive deletes related models i.e. any WorkoutExercise, Sets and
+        # ExerciseStatistics instances with same exerciseID
+        with database.atomic("IMMEDIATE"):
+            # Log the sets and workouts changed by deleting the exercise before
+            # they're deleted
+            self._log_changes(
+                "set",
+                Sets.select(Sets.uid).where(Sets.exercise == exerciseID),
+                "delete",
+            )
+            self._log_changes(
+                "workout",
+                WorkoutExercise.select(WorkoutExercise.workout).where(
+                    WorkoutExercise.exercise == exerciseID
+                ),
+                "upsert",
+            )
+            exercise.delete_instance(recursive=True)
+            self._log_changes("exercise", [exerciseID], "delete")
+            invalidate_metadata()
+        self._clear_entity_cache()
 
     def new_workout(self, name: str, colour: str) -> None:
         """Add new workout to database
@@ -638,8 +1207,10 @@ class WorkoutInterface:
         colour : str
             Workout colour
         """
-        new = Workout.create(name=name, colour=colour)
-        new.save()
+        with database.atomic("IMMEDIATE"):
+            new = Workout.create(name=name, colour=colour)
+            self._log_changes("workout", [new.workout_id], "upsert")
+            invalidate_metadata()
 
     def delete_workout(self, workoutID: int) -> None:
         """Delete workout given by set workoutID.
@@ -653,63 +1224,188 @@ class WorkoutInterface:
         workout = Workout.get(Workout.workout_id == workoutID)
         # Recursive deletes related model i.e. any WorkoutExercise
         # instance with same workoutID
-        workout.delete_instance(recursive=True)
+        with database.atomic("IMMEDIATE"):
+            workout.delete_instance(recursive=True)
+            self._log_changes("workout", [workoutID], "delete")
+            invalidate_metadata()
+        self._clear_entity_cache()
+
+    def _latest_set_uid(self, exercise: Any) -> Select:
+        """Return subquery for the uid of the most recent set of an exercise.
 
-    def _get_workout_last_update(self, workoutID: int) -> Tuple[str, str]:
-        """Return human readable string for when timestamp of last set
-        for exercise in workout.
+        The subquery seeks to the end of the exercise's sets in the
+        (exerciseID, epoch_s) index, so its cost doesn't depend on how many sets the
+        exercise has.
 
         Parameters
         ----------
-        workoutID : int
-            workoutID
+        exercise : Any
+            Exercise ID column of the outer query to correlate the subquery with
 
         Returns
         -------
-        Tuple[str, str, bool]
-            Last exercise
-            Human readable relative datetime string
+        Select
+            Subquery selecting the uid of the latest set, or no rows if the exercise
+            has no sets
         """
-        exercises = WorkoutExercise.select(WorkoutExercise.exercise).where(
-            WorkoutExercise.workout == workoutID
+        LatestSets = Sets.alias()
+        return (
+            LatestSets.select(LatestSets.uid)
+            .where(LatestSets.exercise == exercise)
+            .order_by(LatestSets.epoch_s.desc(), LatestSets.uid.desc())
+            .limit(1)
         )
-        query = Sets.select(fn.MAX(Sets.datetime), Sets.exercise).where(
-            Sets.exercise.in_(exercises)
-        )
-        latest = query[0]
-
-        if latest.datetime is None:
-            return "", "Never"
-        else:
-            return self.get_exercise_name(latest.exercise), self._readable_datetime(
-                latest.datetime
-            )
 
-    def _get_previous_set(self, exerciseID: int, uid: int):
-        """Return last set for exercise given by exerciseID prior to set given by uid
+    def _get_exercise(self, exerciseID: int) -> Exercise:
+        """Return Exercise for exercise ID, fetching it from the database at most
+        once per request.
 
         Parameters
         ----------
         exerciseID : int
-            exerciseID
-        uid : int
-            uid of set to find previous set for
+            Exercise ID
+
+        Returns
+        -------
+        Exercise
+            Exercise model instance
         """
-        prev_set_id = Sets.select(fn.MAX(Sets.uid)).where(
-            (Sets.exercise == exerciseID) & (Sets.uid < uid)
-        )
-        set_ = Sets.get_or_none(Sets.uid == prev_set_id)
-        if set_ is None:
-            return set_
+        return self._get_entity(Exercise, exerciseID)
 
-        return ExerciseSet(
-            set_.uid,
-            set_.datetime,
-            set_.distance_m,
-            set_.weight_kg,
-            set_.time_s,
-            set_.repetitions,
+    def _get_workout(self, workoutID: int) -> Workout:
+        """Return Workout for workout ID, fetching it from the database at most
+        once per request.
+
+        Parameters
+        ----------
+        workoutID : int
+            Workout ID
+
+        Returns
+        -------
+        Workout
+            Workout model instance
+        """
+        return self._get_entity(Workout, workoutID)
+
+    def _get_entity(self, model: Type[Model], pk: int) -> Model:
+        """Return model instance by primary key, using the identity map stored on
+        flask.g for the current request.
+        Outside of a request, the instance is always fetched from the database.
+
+        Parameters
+        ----------
+        model : Type[Model]
+            Model class
+        pk : int
+            Primary key
+
+        Returns
+        -------
+        Model
+            Model instance
+        """
+        if not has_app_context():
+            return model.get_by_id(pk)
+
+        cache = g.setdefault("entity_cache", {})
+        # IDs may come from the URL or the query string, so normalise to string
+        key = (model, str(pk))
+        if key in cache:
+            g.entity_cache_hits = g.get("entity_cache_hits", 0) + 1
+            return cache[key]
+
+        cache[key] = model.get_by_id(pk)
+        return cache[key]
+
+    def _log_changes(
+        self, entity: str, ids: Union[Iterable[int], Select], operation: str
+    ) -> None:
+        """Append changes to the change log, in the current transaction.
+
+        Parameters
+        ----------
+        entity : str
+            Type of entity changed, one of CHANGE_ENTITIES
+        ids : Union[Iterable[int], Select]
+            IDs of the changed entities, or a query that selects them, which is
+            inserted into the log without reading the IDs into Python
+        operation : str
+            "upsert" if the entities were added or modified, "delete" if they were
+            deleted
+        """
+        fields = [ChangeLog.entity, ChangeLog.entity_id, ChangeLog.operation]
+        if isinstance(ids, Select):
+            query = ids.columns(Value(entity), *ids.selected_columns, Value(operation))
+            ChangeLog.insert_from(query, fields).execute()
+            return
+
+        rows = [(entity, entityID, operation) for entityID in ids]
+        if rows:
+            ChangeLog.insert_many(rows, fields).execute()
+
+    def _get_change_data(
+        self, entity: str, ids: List[int]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Return the current values of changed entities for list_changes
+
+        Parameters
+        ----------
+        entity : str
+            Type of entity, one of CHANGE_ENTITIES
+        ids : List[int]
+            IDs of entities
+
+        Returns
+        -------
+        Dict[int, Dict[str, Any]]
+            Values of each entity that still exists, keyed by ID
+        """
+        if not ids:
+            return {}
+
+        if entity == "set":
+            query = Sets.select(
+                Sets.uid,
+                Sets.uuid,
+                Sets.datetime,
+                Sets.exercise.alias("exerciseID"),
+                Sets.distance_m,
+                Sets.weight_kg,
+                Sets.repetitions,
+                Sets.time_s,
+            ).where(Sets.uid.in_(ids))
+            return {row["uid"]: row for row in query.dicts()}
+
+        if entity == "exercise":
+            query = Exercise.select(
+                Exercise.exercise_id.alias("exerciseID"),
+                Exercise.name,
+                Exercise.type_.alias("type"),
+            ).where(Exercise.exercise_id.in_(ids))
+            return {row["exerciseID"]: row for row in query.dicts()}
+
+        query = Workout.select(
+            Workout.workout_id.alias("workoutID"), Workout.name, Workout.colour
+        ).where(Workout.workout_id.in_(ids))
+        workouts = {
+            row["workoutID"]: {**row, "exerciseIDs": []} for row in query.dicts()
+        }
+        exercises = (
+            WorkoutExercise.select(WorkoutExercise.workout, WorkoutExercise.exercise)
+            .where(WorkoutExercise.workout.in_(ids))
+            .order_by(WorkoutExercise.uid)
+            .tuples()
         )
+        for workoutID, exerciseID in exercises:
+            workouts[workoutID]["exerciseIDs"].append(exerciseID)
+        return workouts
+
+    def _clear_entity_cache(self) -> None:
+        """Clear identity map for current request after a write that modifies or
+        deletes an exercise or workout."""
+        if has_app_context():
+            g.pop("entity_cache", None)
 
     def get_exercise_last_set(self, exerciseID: int) -> ExerciseSet:
         """Return ExerciseSet object for most recent set for exercise
@@ -724,18 +1420,15 @@ class WorkoutInterface:
         ExerciseSet
             Object containing set information
         """
-        query = Sets.select(
-            fn.MAX(Sets.datetime),
-            Sets.uid,
-            Sets.distance_m,
-            Sets.weight_kg,
-            Sets.time_s,
-            Sets.repetitions,
-        ).where(Sets.exercise == exerciseID)
-        set_ = query[0]
+        set_ = (
+            Sets.select()
+            .where(Sets.exercise == exerciseID)
+            .order_by(Sets.epoch_s.desc(), Sets.uid.desc())
+            .first()
+        )
 
         # Exercise has no sets yet
-        if set_.uid is None:
+        if set_ is None:
             return ExerciseSet(0, "", None, None, None, None)
 
         return ExerciseSet(
@@ -747,89 +1440,470 @@ class WorkoutInterface:
             set_.repetitions,
         )
 
-    def _readable_datetime(self, timestamp: str | None) -> str:
-        """Convert an ISO8601 timestamp into a human readable relative string
+    def _set_row_from_post_data(self, post_data: Dict[str, str]) -> Dict[str, Any]:
+        """Convert set data sent by client into a row for the sets table
 
         Parameters
         ----------
-        timestamp : str | None
-            ISO8601 timestamp
+        post_data : Dict[str, str]
+            Data sent by client
 
         Returns
         -------
-        str
-            Human readable relative string
-        """
-        if timestamp is None or timestamp == "":
-            return "Never"
-
-        # Python <3.11 doesn't parse the Z in the timestamp, so the dt object is not
-        # timezone aware. Replace Z with +00:00 to make it timezone aware
-        dt = self._parse_timestamp(timestamp)
-
-        delta = datetime.datetime.now(datetime.timezone.utc) - dt
-        delta_seconds = int(delta.total_seconds())
-
-        if dt.date() == datetime.date.today():
-            if delta_seconds < 60:
-                return "Just now"
-            elif delta_seconds < 3600:
-                mins = int(delta_seconds / 60)
-                unit = "mins" if mins > 1 else "min"
-                return f"{mins} {unit} ago"
-            elif delta_seconds < 3600 * 12:
-                hours = int(delta_seconds / 60 / 60)
-                unit = "hours" if hours > 1 else "hour"
-                return f"{hours} {unit} ago"
-            else:
-                return "Earlier today"
+        Dict[str, Any]
+            Dict of Sets field names and values
+
+        Raises
+        ------
+        ValueError
+            If the timestamp or time is invalid
+        """
+        # Create fallback timestamp in iso format, without milliseconds
+        fallback_timestamp = (
+            datetime.datetime.now(datetime.timezone.utc).isoformat().split(".")[0] + "Z"
+        )
+
+        # Convert time from hours, minutes, seconds into total seconds
+        time = None
+        hours = post_data.get("hours", None)
+        mins = post_data.get("mins", None)
+        secs = post_data.get("secs", None)
+        if hours is not None and mins is not None and secs is not None:
+            time = int(secs or 0) + 60 * int(mins or 0) + 3600 * int(hours or 0)
+
+        timestamp = post_data.get("timestamp", fallback_timestamp)
+        if not isinstance(timestamp, str):
+            raise ValueError(f"Invalid timestamp: {timestamp!r}")
+        try:
+            epoch_s = self._timestamp_to_epoch(timestamp)
+        except ValueError as e:
+            raise ValueError(f"Invalid timestamp: {timestamp!r}") from e
+
+        return {
+            "datetime": timestamp,
+            "epoch_s": epoch_s,
+            "distance_m": post_data.get("distance", None),
+            "exercise": post_data.get("exerciseID", None),
+            "repetitions": post_data.get("reps", None),
+            "time_s": time,
+            "weight_kg": post_data.get("weight", None),
+            "uuid": post_data.get("uuid", str(uuid.uuid4())),
+        }
+
+    def _set_row_from_import(
+        self,
+        row: Any,
+        exercises: Dict[str, Tuple[int, str]],
+        result: Dict[str, Any],
+    ) -> Tuple[Any, ...]:
+        """Validate imported set and convert it into a row for _insert_set_rows,
+        creating its exercise if it doesn't exist and the rest of the set is valid.
+
+        Parameters
+        ----------
+        row : Any
+            Imported set, which should be a dict with the same keys as
+            EXPORT_COLUMNS
+        exercises : Dict[str, Tuple[int, str]]
+            Exercise ID and type, keyed by name. Created exercises are added.
+        result : Dict[str, Any]
+            Import result, the names of created exercises are added to it
+
+        Returns
+        -------
+        Tuple[Any, ...]
+            Values for uuid, datetime, epoch_s, exerciseID, distance_m, weight_kg,
+            repetitions and time_s
+
+        Raises
+        ------
+        ValueError
+            If the set is invalid
+        """
+        if not isinstance(row, dict):
+            raise ValueError(f"expected an object, not {type(row).__name__}")
+
+        name = (self._import_text(row, "exercise") or "").strip()
+        if not name:
+            raise ValueError("missing exercise")
+
+        exercise_type = self._import_text(row, "exercise_type")
+        if name in exercises:
+            exerciseID, existing_type = exercises[name]
+            if exercise_type is not None and exercise_type != existing_type:
+                raise ValueError(
+                    f"exercise {name!r} is {existing_type}, not {exercise_type}"
+                )
+            exercise_type = existing_type
+        elif exercise_type in EXERCISE_TYPE_FIELDS:
+            # Created below, once the rest of the row is known to be valid
+            exerciseID = None
         else:
-            if delta_seconds < 3600 * 24 * 2:
-                return "Yesterday"
-            elif delta_seconds < 3600 * 24 * 7:
-                days = int(delta_seconds / (3600 * 24))
-                return f"{days} days ago"
-            else:
-                return dt.strftime("%b %d %Y")
+            raise ValueError(f"unknown exercise type {exercise_type!r} for {name!r}")
+
+        values = {
+            "distance_m": None,
+            "weight_kg": None,
+            "repetitions": None,
+            "time_s": None,
+        }
+        for field in EXERCISE_TYPE_FIELDS[exercise_type]:
+            value = self._import_number(row.get(field), IMPORT_FIELD_TYPES[field])
+            if value is None:
+                raise ValueError(f"missing {field} for {exercise_type} exercise")
+            elif value < 0:
+                raise ValueError(f"negative {field}")
+            values[field] = value
+
+        # Timestamps without a timezone are in local time
+        timestamp_text = self._import_text(row, "datetime")
+        if timestamp_text is None:
+            raise ValueError("missing datetime")
+        timestamp = self._parse_timestamp(timestamp_text)
+        if timestamp.tzinfo is None and self.timezone is not None:
+            timestamp = timestamp.replace(tzinfo=self.timezone)
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(microsecond=0)
+        datetime_ = timestamp.isoformat().replace("+00:00", "Z")
+
+        uuid_ = self._import_text(row, "uuid") or str(
+            uuid.uuid5(
+                IMPORT_UUID_NAMESPACE,
+                "|".join(str(v) for v in (name, datetime_, *values.values())),
+            )
+        )
+
+        if exerciseID is None:
+            with database.atomic("IMMEDIATE"):
+                exerciseID = Exercise.insert(name=name, type_=exercise_type).execute()
+                self._log_changes("exercise", [exerciseID], "upsert")
+            exercises[name] = (exerciseID, exercise_type)
+            result["exercises_created"].append(name)
+
+        return (
+            uuid_,
+            datetime_,
+            int(timestamp.timestamp()),
+            exerciseID,
+            values["distance_m"],
+            values["weight_kg"],
+            values["repetitions"],
+            values["time_s"],
+        )
+
+    def _import_text(self, row: Dict[str, Any], field: str) -> Optional[str]:
+        """Return text field of imported set
+
+        Parameters
+        ----------
+        row : Dict[str, Any]
+            Imported set
+        field : str
+            Name of field
+
+        Returns
+        -------
+        Optional[str]
+            Value of field, or None if it is missing or empty
+
+        Raises
+        ------
+        ValueError
+            If the value is not a string
+        """
+        value = row.get(field)
+        if value is None or value == "":
+            return None
+        if not isinstance(value, str):
+            raise ValueError(f"{field} must be a string, not {type(value).__name__}")
+
+        return value
+
+    def _import_number(
+        self, value: Any, type_: Type[Union[int, float]]
+    ) -> Optional[Union[int, float]]:
+        """Convert imported value to a number
+
+        Parameters
+        ----------
+        value : Any
+            Value from imported set, which may be a string
+        type_ : Type[Union[int, float]]
+            Type to convert to
 
-    def _timestamp_is_today(self, timestamp: str | None) -> bool:
-        """Return True is timestamp is same day as today
+        Returns
+        -------
+        Optional[Union[int, float]]
+            Converted value, or None if value is empty
+
+        Raises
+        ------
+        ValueError
+            If the value is not a number, or not a whole number for int
+        """
+        if value is None or value == "":
+            return None
+
+        number = float(value)
+        if type_ is int:
+            if not number.is_integer():
+                raise ValueError(f"{value!r} is not a whole number")
+            return int(number)
+
+        return number
+
+    def _insert_set_rows(self, rows: List[Tuple[Any, ...]]) -> int:
+        """Insert rows created by _set_row_from_import into the sets table, ignoring
+        any with the same UUID as an existing set.
+
+        The rows are inserted with a single prepared statement, using executemany.
+
+        Parameters
+        ----------
+        rows : List[Tuple[Any, ...]]
+            Rows to insert
+
+        Returns
+        -------
+        int
+            Number of rows inserted
+        """
+        fields = (
+            Sets.uuid,
+            Sets.datetime,
+            Sets.epoch_s,
+            Sets.exercise,
+            Sets.distance_m,
+            Sets.weight_kg,
+            Sets.repetitions,
+            Sets.time_s,
+        )
+        columns = ", ".join(f'"{field.column_name}"' for field in fields)
+        placeholders = ", ".join("?" for _ in fields)
+        sql = (
+            f'INSERT INTO "{Sets._meta.table_name}" ({columns}) '
+            f'VALUES ({placeholders}) ON CONFLICT ("uuid") DO NOTHING'
+        )
+        cursor = database.cursor()
+        cursor.executemany(sql, rows)
+        return cursor.rowcount
+
+    def _get_set_uids(self, uuids: List[str]) -> List[int]:
+        """Return uid of each set given by UUID
 
         Parameters
         ----------
-        timestamp : str | None
-            ISO8601 timestamp or None
+        uuids : List[str]
+            Set UUIDs
 
         Returns
         -------
-        bool
-            True is timestamp day is today
+        List[int]
+            Unique ID of each set, in the same order as uuids
         """
-        if timestamp is None or timestamp == "":
-            return False
+        uids = dict(
+            Sets.select(Sets.uuid, Sets.uid).where(Sets.uuid.in_(uuids)).tuples()
+        )
+        return [uids[uuid_] for uuid_ in uuids]
 
-        dt = self._parse_timestamp(timestamp)
-        return dt.date() == datetime.date.today()
+    def _get_exercise_statistics(self, exerciseID: int) -> ExerciseStatistics:
+        """Return stored statistics for exercise, with the most recent set joined as
+        the latest_set attribute.
 
-    def _timestamp_is_within_year(self, timestamp: str | None) -> bool:
-        """Return True is timestamp is within a year of the current date.
+        The statistics are calculated if they have not been stored yet. The total for
+        the last year is brought up to date if the start of the year window has moved
+        on since it was last calculated, by subtracting the sets that have dropped
+        out of the window. Both are done in a write transaction, so concurrent
+        requests can't subtract the same sets twice.
 
         Parameters
         ----------
-        timestamp : str | None
-            ISO8601 timestamp or None
+        exerciseID : int
+            Exercise ID
 
         Returns
         -------
-        bool
-            True if time since timestamp is less than or equal to a year
+        ExerciseStatistics
+            Statistics for exercise
         """
-        if timestamp is None or timestamp == "":
-            return False
+        query = (
+            ExerciseStatistics.select(ExerciseStatistics, Sets)
+            .join(
+                Sets,
+                JOIN.LEFT_OUTER,
+                on=(ExerciseStatistics.latest_uid == Sets.uid),
+                attr="latest_set",
+            )
+            .where(ExerciseStatistics.exercise == exerciseID)
+        )
+        year_start = self._year_start_epoch()
+        stats = query.get_or_none()
+        if stats is not None and stats.year_start_s >= year_start:
+            return stats
+
+        # Read the statistics again in the write transaction, because another request
+        # may have brought them up to date since they were read above
+        with database.atomic("IMMEDIATE"):
+            stats = query.get_or_none()
+            if stats is None:
+                self._refresh_exercise_stats(exerciseID)
+                return query.get()
+
+            if stats.year_start_s < year_start:
+                expired = (
+                    Sets.select(fn.SUM(STATS_TOTAL))
+                    .where(
+                        (Sets.exercise == exerciseID)
+                        & (Sets.epoch_s >= stats.year_start_s)
+                        & (Sets.epoch_s < year_start)
+                    )
+                    .scalar()
+                )
+                ExerciseStatistics.update(
+                    year_total=ExerciseStatistics.year_total - (expired or 0),
+                    year_start_s=year_start,
+                ).where(ExerciseStatistics.exercise == exerciseID).execute()
+                stats.year_total -= expired or 0
+                stats.year_start_s = year_start
+
+        return stats
 
-        dt = self._parse_timestamp(timestamp)
-        delta = datetime.date.today() - dt.date()
-        return delta.days <= 365
+    def _refresh_exercise_stats(self, exerciseID: int) -> None:
+        """Recalculate the stored statistics for exercise from its sets.
+
+        Parameters
+        ----------
+        exerciseID : int
+            Exercise ID
+        """
+        year_start = self._year_start_epoch()
+        latest = (
+            Sets.select(Sets.uid, Sets.epoch_s)
+            .where(Sets.exercise == exerciseID)
+            .order_by(Sets.epoch_s.desc(), Sets.uid.desc())
+            .first()
+        )
+        max_time_s, year_total = (
+            Sets.select(
+                fn.MAX(Sets.time_s),
+                fn.SUM(Case(None, [(Sets.epoch_s >= year_start, STATS_TOTAL)], 0)),
+            )
+            .where(Sets.exercise == exerciseID)
+            .tuples()
+            .get()
+        )
+
+        ExerciseStatistics.replace(
+            exercise=exerciseID,
+            latest_uid=latest.uid if latest else None,
+            latest_epoch_s=latest.epoch_s if latest else None,
+            max_time_s=max_time_s,
+            year_total=year_total or 0,
+            year_start_s=year_start,
+        ).execute()
+
+    def _add_set_to_exercise_stats(self, uid: int) -> None:
+        """Update the stored statistics for an exercise with a newly added set.
+
+        Parameters
+        ----------
+        uid : int
+            Set unique ID
+        """
+        set_ = (
+            Sets.select(
+                Sets.uid,
+                Sets.exercise,
+                Sets.epoch_s,
+                Sets.time_s,
+                STATS_TOTAL.alias("total"),
+            )
+            .where(Sets.uid == uid)
+            .get()
+        )
+        stats = ExerciseStatistics.get_or_none(
+            ExerciseStatistics.exercise == set_.exerciseID
+        )
+        if stats is None:
+            self._refresh_exercise_stats(set_.exerciseID)
+            return
+
+        if stats.latest_epoch_s is None or set_.epoch_s >= stats.latest_epoch_s:
+            stats.latest_uid = set_.uid
+            stats.latest_epoch_s = set_.epoch_s
+
+        if set_.time_s is not None:
+            stats.max_time_s = max(stats.max_time_s or 0, set_.time_s)
+
+        if set_.epoch_s >= stats.year_start_s:
+            stats.year_total += set_.total or 0
+
+        stats.save()
+
+    def today(self) -> datetime.date:
+        """Return the current date in local time
+
+        Returns
+        -------
+        datetime.date
+            Today's date
+        """
+        return datetime.datetime.now(self.timezone).date()
+
+    def _local_day_bounds(self, date: datetime.date) -> Tuple[int, int]:
+        """Return the range of unix epoch timestamps covered by a day in local time,
+        for comparing against Sets.epoch_s.
+
+        Parameters
+        ----------
+        date : datetime.date
+            Day to return range for
+
+        Returns
+        -------
+        Tuple[int, int]
+            Epoch of start of day (inclusive)
+            Epoch of start of following day (exclusive)
+        """
+        start = datetime.datetime.combine(
+            date, datetime.time.min, tzinfo=self.timezone
+        ).astimezone()
+        end = datetime.datetime.combine(
+            date + datetime.timedelta(days=1), datetime.time.min, tzinfo=self.timezone
+        ).astimezone()
+        return int(start.timestamp()), int(end.timestamp())
+
+    def _sqlite_local_modifiers(self) -> Tuple[str, str]:
+        """Return SQLite date function modifiers for converting between UTC and
+        local time.
+
+        SQLite only knows the server's local time, so if a timezone is configured
+        its current UTC offset is used. Days either side of a daylight saving change
+        may be off by an hour.
+
+        Returns
+        -------
+        Tuple[str, str]
+            Modifier to convert UTC to local time
+            Modifier to convert local time to UTC
+        """
+        if self.timezone is None:
+            return "localtime", "utc"
+
+        offset = datetime.datetime.now(self.timezone).utcoffset()
+        seconds = int(offset.total_seconds()) if offset else 0
+        return f"{seconds:+d} seconds", f"{-seconds:+d} seconds"
+
+    def _year_start_epoch(self) -> int:
+        """Return epoch at the start of the same day last year, in local time.
+        Sets logged on or after this are included in the totals for the last year.
+
+        Returns
+        -------
+        int
+            Seconds since unix epoch
+        """
+        start, _ = self._local_day_bounds(self.today() - datetime.timedelta(days=365))
+        return start
 
     def _create_set_summary(self, details: ExerciseSet) -> str:
         """Generate string that summarises a set
@@ -862,6 +1936,42 @@ class WorkoutInterface:
 
         return set_string
 
+    def _set_details(
+        self, current_set: ExerciseSet, previous_set: Optional[ExerciseSet]
+    ) -> Dict[str, Any]:
+        """Return details of set for display, including the change from the
+        previous set for the exercise.
+
+        Parameters
+        ----------
+        current_set : ExerciseSet
+            Set to return details for
+        previous_set : Optional[ExerciseSet]
+            Set logged before current_set for the same exercise, if any
+
+        Returns
+        -------
+        Dict[str, Any]
+            Dict containing set uid, timestamp, summary, values and delta
+        """
+        if previous_set is not None:
+            delta = self._calculate_set_delta(current_set, previous_set)
+        else:
+            delta = None
+
+        return {
+            "uid": current_set.uid,
+            "timestamp": current_set.datetime,
+            "set_detail": self._create_set_summary(current_set),
+            "distance": current_set.distance_m,
+            "weight": current_set.weight_kg,
+            "hours": current_set.hours,
+            "mins": current_set.mins,
+            "seconds": current_set.seconds,
+            "repetitions": current_set.repetitions,
+            "delta": delta,
+        }
+
     def _calculate_set_delta(
         self, current_set: ExerciseSet, previous_set: ExerciseSet
     ) -> Optional[float]:
@@ -938,6 +2048,21 @@ class WorkoutInterface:
         """
         return datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
 
+    def _timestamp_to_epoch(self, timestamp: str) -> int:
+        """Convert ISO8601 timestamp string to unix epoch, in seconds
+
+        Parameters
+        ----------
+        timestamp : str
+            ISO8601 formatted timestamp
+
+        Returns
+        -------
+        int
+            Seconds since unix epoch
+        """
+        return int(self._parse_timestamp(timestamp).timestamp())
+
     def _calculate_one_rep_max(self, weight: float, reps: int) -> float:
         """Calculate one rep max using Brzycki formula
 
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+
+from gymlog import app
+from gymlog.models import database
+
+# Upper bounds of histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _format_labels(labels: Sequence[str], label_values: Sequence[str]) -> List[str]:
+    """Return label="value" pairs for Prometheus text exposition format
+
+    Parameters
+    ----------
+    labels : Sequence[str]
+        Label names
+    label_values : Sequence[str]
+        Value for each label
+
+    Returns
+    -------
+    List[str]
+        Pairs
+    """
+    return [f'{label}="{value}"' for label, value in zip(labels, label_values)]
+
+
+class Histogram:
+    """Prometheus histogram with one series per set of label values.
+
+    Parameters
+    ----------
+    name : str
+        Metric name
+    description : str
+        Metric description
+    labels : Sequence[str]
+        Label names
+    buckets : Sequence[float]
+        Upper bounds of buckets, in ascending order
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str],
+        buckets: Sequence[float],
+    ):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # Label values: (bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Record value in series given by label values
+
+        Parameters
+        ----------
+        value : float
+            Observed value
+        *label_values : str
+            Value for each label, in the same order as labels
+        """
+        with self._lock:
+            bucket_counts, total, count = self._series.get(
+                label_values, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    bucket_counts[i] += 1
+            self._series[label_values] = (bucket_counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        """Return histogram in Prometheus text exposition format
+
+        Returns
+        -------
+        List[str]
+            Lines of text
+        """
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in self._series.items():
+                pairs = _format_labels(self.labels, label_values)
+                for upper, bucket_count in zip(self.buckets, bucket_counts):
+                    bucket_labels = ",".join(pairs + [f'le="{upper}"'])
+                    lines.append(
+                        f"{self.name}_bucket{{{bucket_labels}}} {bucket_count}"
+                    )
+                bucket_labels = ",".join(pairs + ['le="+Inf"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+                labels = "{" + ",".join(pairs) + "}" if pairs else ""
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+
+        return lines
+
+
+class Gauge:
+    """Prometheus gauge without labels.
+
+    Parameters
+    ----------
+    name : str
+        Metric name
+    description : str
+        Metric description
+    """
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Set current value
+
+        Parameters
+        ----------
+        value : float
+            Current value
+        """
+        self.value = value
+
+    def render(self) -> List[str]:
+        """Return gauge in Prometheus text exposition format
+
+        Returns
+        -------
+        List[str]
+            Lines of text
+        """
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.value}",
+        ]
+
+
+REQUEST_DURATION = Histogram(
+    "gymlog_request_duration_seconds",
+    "Time taken to process request",
+    ("endpoint", "method"),
+    DURATION_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "gymlog_request_queries",
+    "Number of SQL statements executed by request",
+    ("endpoint", "method"),
+    QUERY_COUNT_BUCKETS,
+)
+REQUEST_SQL_DURATION = Histogram(
+    "gymlog_request_sql_duration_seconds",
+    "Total time spent executing SQL statements for request",
+    ("endpoint", "method"),
+    DURATION_BUCKETS,
+)
+REQUEST_RENDER_DURATION = Histogram(
+    "gymlog_request_render_duration_seconds",
+    "Time spent rendering templates for request",
+    ("endpoint", "method"),
+    DURATION_BUCKETS,
+)
+WRITE_BATCH_SIZE = Histogram(
+    "gymlog_write_batch_size",
+    "Number of writes committed in each group commit transaction",
+    (),
+    BATCH_SIZE_BUCKETS,
+)
+WRITE_QUEUE_DEPTH = Gauge(
+    "gymlog_write_queue_depth",
+    "Number of writes waiting for the group commit writer",
+)
+METRICS = [
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    REQUEST_SQL_DURATION,
+    REQUEST_RENDER_DURATION,
+    WRITE_BATCH_SIZE,
+    WRITE_QUEUE_DEPTH,
+]
+
+
+class RequestMetrics:
+    """Timings for the current request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.render_time = 0.0
+        self.render_start: Optional[float] = None
+
+
+def _record_query(sql: str, duration: float) -> None:
+    """Add SQL statement to the metrics for the current request, if any.
+
+    Parameters
+    ----------
+    sql : str
+        SQL statement
+    duration : float
+        Time taken to execute statement, in seconds
+    """
+    if not has_request_context() or "request_metrics" not in g:
+        return
+
+    metrics = g.request_metrics
+    metrics.query_count += 1
+    metrics.sql_time += duration
+    if duration > metrics.slowest_time:
+        metrics.slowest_time = duration
+        metrics.slowest_sql = sql
+
+
+def _start_render(sender: Flask, **extra) -> None:
+    """Record start time of template rendering"""
+    if "request_metrics" in g:
+        g.request_metrics.render_start = time.perf_counter()
+
+
+def _end_render(sender: Flask, **extra) -> None:
+    """Add time taken to render template to metrics for the current request"""
+    if "request_metrics" in g and g.request_metrics.render_start is not None:
+        metrics = g.request_metrics
+        metrics.render_time += time.perf_counter() - metrics.render_start
+        metrics.render_start = None
+
+
+database.timing_hooks.append(_record_query)
+before_render_template.connect(_start_render, app)
+template_rendered.connect(_end_render, app)
+
+
+@app.before_request
+def start_request_metrics() -> None:
+    """Start recording metrics for request"""
+    g.request_metrics = RequestMetrics()
+
+
+@app.after_request
+def finish_request_metrics(response: Response) -> Response:
+    """Add SQL and render timings for request to Server-Timing header and to the
+    per-endpoint histograms.
+
+    Parameters
+    ----------
+    response : Response
+        Request Response object
+
+    Returns
+    -------
+    Response
+        Request Response object
+    """
+    metrics = g.get("request_metrics")
+    if metrics is None:
+        return response
+
+    total_time = time.perf_counter() - metrics.start
+    timings = [
+        f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.query_count} queries"',
+        f"db-slowest;dur={metrics.slowest_time * 1000:.2f}",
+        f"render;dur={metrics.render_time * 1000:.2f}",
+        f"total;dur={total_time * 1000:.2f}",
+    ]
+    response.headers.add("Server-Timing", ", ".join(timings))
+
+    if metrics.slowest_sql is not None:
+        app.logger.debug(
+            "Slowest query for %s took %.2f ms: %s",
+            request.path,
+            metrics.slowest_time * 1000,
+            metrics.slowest_sql,
+        )
+
+    labels = (request.endpoint or "none", request.method)
+    REQUEST_DURATION.observe(total_time, *labels)
+    REQUEST_QUERIES.observe(metrics.query_count, *labels)
+    REQUEST_SQL_DURATION.observe(metrics.sql_time, *labels)
+    REQUEST_RENDER_DURATION.observe(metrics.render_time, *labels)
+    return response
+
+
+def render_metrics() -> str:
+    """Return all metrics in Prometheus text exposition format
+
+    Returns
+    -------
+    str
+        Metrics
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+from typing import Callable, List
+
+import peewee as pw
+from peewee import fn
+from playhouse.migrate import SqliteMigrator, migrate
+
+from gymlog.models import (
+    database,
+    ChangeLog,
+    DataVersion,
+    Exercise,
+    ExerciseStatistics,
+    SchemaVersion,
+    Sets,
+    Workout,
+    WorkoutExercise,
+)
+
+MODELS = [
+    Exercise,
+    Workout,
+    Sets,
+    WorkoutExercise,
+    ExerciseStatistics,
+    DataVersion,
+    ChangeLog,
+    SchemaVersion,
+]
+
+
+def _add_set_and_workout_exercise_indexes(migrator: SqliteMigrator) -> None:
+    """Add composite indexes on the sets table for the per-exercise queries and
+    prevent an exercise being added to the same workout more than once.
+
+    Parameters
+    ----------
+    migrator : SqliteMigrator
+        Migrator for database
+    """
+    # Remove any duplicate workout-exercise pairs so the unique index can be created
+    first_uids = WorkoutExercise.select(fn.MIN(WorkoutExercise.uid)).group_by(
+        WorkoutExercise.workout, WorkoutExercise.exercise
+    )
+    WorkoutExercise.delete().where(WorkoutExercise.uid.not_in(first_uids)).execute()
+
+    migrate(
+        migrator.add_index("sets", ("exerciseID", "datetime"), False),
+        migrator.add_index("sets", ("exerciseID", "uid"), False),
+        migrator.add_index(
+            "workout_exercise",
+            ("workoutID", "exerciseID"),
+            True,
+            name="workoutexercise_workoutID_exerciseID",
+        ),
+    )
+
+
+def _add_set_epoch_column(migrator: SqliteMigrator) -> None:
+    """Add indexed integer unix epoch column to the sets table, backfilled from the
+    ISO8601 datetime column, so date ranges can be filtered in SQL.
+
+    Parameters
+    ----------
+    migrator : SqliteMigrator
+        Migrator for database
+    """
+    migrate(migrator.add_column("sets", "epoch_s", pw.IntegerField(null=True)))
+    Sets.update(epoch_s=fn.strftime("%s", Sets.datetime).cast("INTEGER")).execute()
+    migrate(migrator.add_index("sets", ("exerciseID", "epoch_s"), False))
+
+
+def _add_exercise_stats_table(migrator: SqliteMigrator) -> None:
+    """Add table of per-exercise statistics.
+    Rows are populated the first time the statistics for an exercise are requested.
+
+    Parameters
+    ----------
+    migrator : SqliteMigrator
+        Migrator for database
+    """
+    ExerciseStatistics.create_table()
+
+
+def _add_data_version_table(migrator: SqliteMigrator) -> None:
+    """Add table of version numbers for data that is cached by the app, which are
+    incremented whenever the data changes.
+
+    Parameters
+    ----------
+    migrator : SqliteMigrator
+        Migrator for database
+    """
+    DataVersion.create_table()
+
+
+def _add_change_log_table(migrator: SqliteMigrator) -> None:
+    """Add append-only log of changes to sets, exercises and workouts, which clients
+    use to fetch what has changed since they last synced.
+
+    The log starts with an upsert for every existing exercise, workout and set, so a
+    client syncing from the start gets everything.
+
+    Parameters
+    ----------
+    migrator : SqliteMigrator
+        Migrator for database
+    """
+    ChangeLog.create_table()
+    fields = [ChangeLog.entity, ChangeLog.entity_id, ChangeLog.operation]
+    for entity, id_field in (
+        ("exercise", Exercise.exercise_id),
+        ("workout", Workout.workout_id),
+        ("set", Sets.uid),
+    ):
+        query = id_field.model.select(
+            pw.Value(entity), id_field, pw.Value("upsert")
+        ).order_by(id_field)
+        ChangeLog.insert_from(query, fields).execute()
+
+
+# Ordered list of migrations.
+# The schema version of a database is the number of migrations that have been
+# applied to it, so new migrations must only ever be appended to this list.
+MIGRATIONS: List[Callable[[SqliteMigrator], None]] = [
+    _add_set_and_workout_exercise_indexes,
+    _add_set_epoch_column,
+    _add_exercise_stats_table,
+    _add_data_version_table,
+    _add_change_log_table,
+]
+
+
+def migrate_database() -> None:
+    """Bring the database schema up to date.
+
+    A new database is created directly from the current model definitions and
+    marked as being at the latest schema version. An existing database has any
+    migrations it has not yet had applied run in order.
+
+    Everything happens in a single IMMEDIATE transaction, so if multiple workers
+    start at the same time, only one of them will apply the migrations.
+    """
+    with database.atomic("IMMEDIATE"):
+        if not database.table_exists(Sets._meta.table_name):
+            database.create_tables(MODELS, safe=True)
+            SchemaVersion.create(version=len(MIGRATIONS))
+            return
+
+        SchemaVersion.create_table(safe=True)
+        schema = SchemaVersion.get_or_none()
+        if schema is None:
+            schema = SchemaVersion.create(version=0)
+
+        migrator = SqliteMigrator(database)
+        for migration in MIGRATIONS[schema.version :]:
+            migration(migrator)
+            schema.version += 1
+
+        schema.save()
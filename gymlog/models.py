@@ -1,6 +1,59 @@
-import peewee as pw
+import time
+from typing import Callable, List
 
-database = pw.SqliteDatabase("data/gym-log.db")
+import peewee as pw
+from playhouse.pool import PooledSqliteDatabase
+from playhouse.sqlite_ext import AutoIncrementField
+
+# SQLite pragmas applied to each new connection
+DATABASE_PROFILES = {
+    # SQLite defaults, but wait for locks and enforce foreign keys
+    "development": {
+        "busy_timeout": 5000,
+        "foreign_keys": 1,
+    },
+    # Allow readers to continue while a set is being written and wait for, rather
+    # than fail on, locks held by other workers
+    "production": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -32000,  # 32 MB
+        "mmap_size": 128 * 1024 * 1024,
+        "busy_timeout": 5000,
+        "foreign_keys": 1,
+    },
+}
+
+
+class InstrumentedSqliteDatabase(PooledSqliteDatabase):
+    """Pooled SQLite database that calls each function in `timing_hooks` with the
+    SQL and duration in seconds of every statement executed.
+    Statements are not timed if there are no hooks.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timing_hooks: List[Callable[[str, float], None]] = []
+
+    def execute_sql(self, sql, params=None):
+        if not self.timing_hooks:
+            return super().execute_sql(sql, params)
+
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params)
+        finally:
+            duration = time.perf_counter() - start
+            for hook in self.timing_hooks:
+                hook(sql, duration)
+
+
+# The database path, pragmas and pool size are set from the app config when the app
+# is created.
+# Connections are returned to the pool when closed and may be reused by a different
+# thread for a later request, so sqlite3's same-thread check is disabled. A
+# connection is only ever used by one thread at a time.
+database = InstrumentedSqliteDatabase(None, stale_timeout=300, check_same_thread=False)
 
 
 class UnknownField(object):
@@ -24,6 +77,7 @@ class Exercise(BaseModel):
 
 class Sets(BaseModel):
     datetime = pw.TextField()
+    epoch_s = pw.IntegerField(null=True)
     distance_m = pw.FloatField(null=True)
     exercise = pw.ForeignKeyField(
         column_name="exerciseID", field="exercise_id", model=Exercise
@@ -36,6 +90,11 @@ class Sets(BaseModel):
 
     class Meta:
         table_name = "sets"
+        indexes = (
+            (("exercise", "datetime"), False),
+            (("exercise", "uid"), False),
+            (("exercise", "epoch_s"), False),
+        )
 
 
 class Workout(BaseModel):
@@ -58,3 +117,44 @@ class WorkoutExercise(BaseModel):
 
     class Meta:
         table_name = "workout_exercise"
+        indexes = ((("workout", "exercise"), True),)
+
+
+class ExerciseStatistics(BaseModel):
+    exercise = pw.ForeignKeyField(
+        column_name="exerciseID", field="exercise_id", model=Exercise, primary_key=True
+    )
+    latest_uid = pw.IntegerField(null=True)
+    latest_epoch_s = pw.IntegerField(null=True)
+    max_time_s = pw.IntegerField(null=True)
+    year_total = pw.FloatField(default=0)
+    year_start_s = pw.IntegerField()
+
+    class Meta:
+        table_name = "exercise_stats"
+
+
+class DataVersion(BaseModel):
+    name = pw.TextField(primary_key=True)
+    version = pw.IntegerField(default=0)
+
+    class Meta:
+        table_name = "data_version"
+
+
+class ChangeLog(BaseModel):
+    # AUTOINCREMENT, so sequence numbers are never reused
+    seq = AutoIncrementField()
+    entity = pw.TextField()
+    entity_id = pw.IntegerField()
+    operation = pw.TextField()
+
+    class Meta:
+        table_name = "change_log"
+
+
+class SchemaVersion(BaseModel):
+    version = pw.IntegerField()
+
+    class Meta:
+        table_name = "schema_version"
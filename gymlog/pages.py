@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import datetime
+import functools
+import zoneinfo
+from typing import Callable
+
+from flask import Response, make_response, request
+
+from gymlog import app
+from gymlog.assets import ASSETS_VERSION
+from gymlog.interfaces.cache import VersionedCache, get_data_version
+
+# Rendered pages, keyed by path and query string.
+# Disabled unless PAGE_CACHE_SIZE is greater than 0.
+page_cache = VersionedCache(maxsize=app.config["PAGE_CACHE_SIZE"], ttl=3600)
+
+# Timezone of the date in the ETag, the server's local time if not set
+TIMEZONE = zoneinfo.ZoneInfo(app.config["TIMEZONE"]) if app.config["TIMEZONE"] else None
+
+
+def _page_etag() -> str:
+    """Return ETag for pages rendered from the current data.
+
+    Relative times are rendered by the client, but the exercise page shows the sets
+    logged today, so the ETag also changes each day. Pages link to static files by
+    their fingerprinted URLs, so the ETag also changes when a static file does.
+
+    Returns
+    -------
+    str
+        ETag
+    """
+    version = get_data_version("data")
+    today = datetime.datetime.now(TIMEZONE).date()
+    return f"{version}-{ASSETS_VERSION}-{today.isoformat()}"
+
+
+def conditional_page(view: Callable) -> Callable:
+    """Decorator for views that render pages from the data in the database.
+
+    GET responses are given a weak ETag derived from the data version and must be
+    revalidated by the client before reuse. If the client already has the page for
+    the current ETag, an empty 304 response is returned without calling the view.
+    If the page cache is enabled, the rendered page is also cached until the data
+    changes.
+
+    Parameters
+    ----------
+    view : Callable
+        View function
+
+    Returns
+    -------
+    Callable
+        Wrapped view function
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET":
+            return view(*args, **kwargs)
+
+        etag = _page_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        elif page_cache.maxsize > 0:
+            page_cache.validate(etag)
+            found, page = page_cache.get(request.full_path)
+            if found:
+                response = Response(page, mimetype="text/html")
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    page_cache.set(request.full_path, response.get_data())
+        else:
+            response = make_response(view(*args, **kwargs))
+
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    return wrapper
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import cProfile
+import os
+import time
+from typing import Callable, Iterable, List
+
+
+class RequestProfiler:
+    """WSGI middleware that profiles requests with cProfile and writes the results
+    to `profile_dir`, for viewing with e.g. snakeviz.
+
+    If `profile_all` is True, every request is profiled. Otherwise only requests
+    with an X-Profile header from one of `allowed_addresses` are profiled.
+    Only the most recent `max_profiles` profiles are kept.
+
+    Parameters
+    ----------
+    wsgi_app : Callable
+        WSGI app to profile
+    profile_dir : str
+        Directory to write profiles to
+    profile_all : bool
+        Profile every request
+    allowed_addresses : List[str]
+        Client addresses allowed to request a profile using the X-Profile header
+    max_profiles : int
+        Maximum number of profiles to keep
+    """
+
+    def __init__(
+        self,
+        wsgi_app: Callable,
+        profile_dir: str,
+        profile_all: bool,
+        allowed_addresses: List[str],
+        max_profiles: int,
+    ):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        self.profile_all = profile_all
+        self.allowed_addresses = set(allowed_addresses)
+        self.max_profiles = max_profiles
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        if not self._should_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        body: List[bytes] = []
+
+        def run_app():
+            app_iter = self.wsgi_app(environ, start_response)
+            try:
+                body.extend(app_iter)
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+
+        profile = cProfile.Profile()
+        profile.runcall(run_app)
+        self._save_profile(profile, environ)
+        return body
+
+    def _should_profile(self, environ: dict) -> bool:
+        """Return True if request should be profiled
+
+        Parameters
+        ----------
+        environ : dict
+            WSGI environment for request
+
+        Returns
+        -------
+        bool
+            True if request should be profiled
+        """
+        if self.profile_all:
+            return True
+
+        return (
+            "HTTP_X_PROFILE" in environ
+            and environ.get("REMOTE_ADDR") in self.allowed_addresses
+        )
+
+    def _save_profile(self, profile: cProfile.Profile, environ: dict) -> None:
+        """Write profile to profile directory, then delete the oldest profiles if
+        there are more than the maximum.
+
+        Parameters
+        ----------
+        profile : cProfile.Profile
+            Profile of request
+        environ : dict
+            WSGI environment for request
+        """
+        path = environ.get("PATH_INFO", "").strip("/").replace("/", ".") or "root"
+        filename = f"{time.time_ns()}.{environ['REQUEST_METHOD']}.{path}.prof"
+        profile.dump_stats(os.path.join(self.profile_dir, filename))
+
+        profiles = sorted(
+            entry.path
+            for entry in os.scandir(self.profile_dir)
+            if entry.name.endswith(".prof")
+        )
+        # File names start with a timestamp, so the oldest are first
+        for old_profile in profiles[: -self.max_profiles]:
+            try:
+                os.remove(old_profile)
+            except FileNotFoundError:
+                # Already removed by another worker
+                pass
@@ -1,3 +1,4 @@
+import { isToday, showRelativeTimes } from "./relativeTime.js";
 const hideDialogAnimation = [{ transform: "translateY(-100%" }];
 const hideDialogTiming = {
     duration: 100,
@@ -153,7 +154,19 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
     showOfflineSets();
+    showRelativeTimes();
+    highlightTodayInGraph();
 });
+function highlightTodayInGraph() {
+    let groups = document.querySelectorAll(".graph-group");
+    groups.forEach((el) => {
+        if (isToday(new Date(el.dataset.day + "T00:00"))) {
+            el.querySelectorAll(".graph-bar").forEach((bar) => {
+                bar.classList.add("graph-bar-today");
+            });
+        }
+    });
+}
 function isoDateTime() {
     return new Date().toISOString().split(".")[0] + "Z";
 }
@@ -1,4 +1,5 @@
 import { saveError, saveSuccess } from "./saveFunctions.js";
+import { isToday, showRelativeTimes } from "./relativeTime.js";
 
 const hideDialogAnimation = [{ transform: "translateY(-100%" }];
 const hideDialogTiming = {
@@ -225,7 +226,25 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 
   showOfflineSets();
+  showRelativeTimes();
+  highlightTodayInGraph();
 });
+/**
+ * Highlight the bars in the history graph for sets logged today.
+ */
+function highlightTodayInGraph() {
+  let groups: NodeListOf<HTMLDivElement> =
+    document.querySelectorAll(".graph-group");
+  groups.forEach((el) => {
+    // Date only ISO8601 strings are parsed as UTC, so add a time to parse as local
+    if (isToday(new Date(el.dataset.day + "T00:00"))) {
+      el.querySelectorAll(".graph-bar").forEach((bar) => {
+        bar.classList.add("graph-bar-today");
+      });
+    }
+  });
+}
+
 /**
  * Return current ISO8601 datetime without milliseconds.
  */
@@ -1,3 +1,4 @@
+import { showRelativeTimes } from "./relativeTime.js";
 const hideDialogAnimation = [{ transform: "translateY(-100%" }];
 const hideDialogTiming = {
     duration: 100,
@@ -10,6 +11,7 @@ var OfflineStatus;
 })(OfflineStatus || (OfflineStatus = {}));
 document.addEventListener("DOMContentLoaded", () => {
     installServiceWorker();
+    showRelativeTimes();
     let offlineBtn = document.querySelector("#offline");
     offlineBtn.addEventListener("click", toggleOfflineStatus);
     let offline = JSON.parse(localStorage.getItem("offline"));
@@ -105,10 +107,27 @@ function syncOfflineSets() {
     fetch("/sync", {
         method: "POST",
         body: form,
-    }).then((res) => {
-        if (res.ok) {
-            localStorage.setItem("offline-sets", "[]");
+    })
+        .then((res) => {
+        if (!res.ok) {
+            throw new Error(`Sync failed with status ${res.status}`);
         }
+        return res.json();
+    })
+        .then((result) => {
+        let synced = new Set([
+            ...result.inserted,
+            ...result.duplicates,
+            ...result.rejected,
+        ]);
+        let remaining = JSON.parse(localStorage.getItem("offline-sets")) || [];
+        remaining = remaining.filter((s) => {
+            return s.uuid !== undefined && !synced.has(s.uuid);
+        });
+        localStorage.setItem("offline-sets", JSON.stringify(remaining));
+    })
+        .catch((err) => {
+        console.log(`CLIENT: ${err.message}`);
     });
 }
 function installServiceWorker() {
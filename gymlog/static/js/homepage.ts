@@ -1,4 +1,5 @@
 import { saveError, saveSuccess } from "./saveFunctions.js";
+import { showRelativeTimes } from "./relativeTime.js";
 
 const hideDialogAnimation = [{ transform: "translateY(-100%" }];
 const hideDialogTiming = {
@@ -13,6 +14,7 @@ enum OfflineStatus {
 
 document.addEventListener("DOMContentLoaded", () => {
   installServiceWorker();
+  showRelativeTimes();
 
   let offlineBtn: HTMLButtonElement = document.querySelector(
     "#offline",
@@ -146,11 +148,30 @@ function syncOfflineSets() {
   fetch("/sync", {
     method: "POST",
     body: form,
-  }).then((res) => {
-    if (res.ok) {
-      localStorage.setItem("offline-sets", "[]");
-    }
-  });
+  })
+    .then((res) => {
+      if (!res.ok) {
+        throw new Error(`Sync failed with status ${res.status}`);
+      }
+      return res.json();
+    })
+    .then((result) => {
+      // Only remove the sets the server has confirmed it now has, or can never
+      // save, in case more were saved while the sync was in progress
+      let synced = new Set([
+        ...result.inserted,
+        ...result.duplicates,
+        ...result.rejected,
+      ]);
+      let remaining = JSON.parse(localStorage.getItem("offline-sets")) || [];
+      remaining = remaining.filter((s) => {
+        return s.uuid !== undefined && !synced.has(s.uuid);
+      });
+      localStorage.setItem("offline-sets", JSON.stringify(remaining));
+    })
+    .catch((err) => {
+      console.log(`CLIENT: ${err.message}`);
+    });
 }
 
 /**
@@ -0,0 +1,41 @@
+export function isToday(date) {
+    return date.toDateString() == new Date().toDateString();
+}
+export function formatRelativeTime(timestamp) {
+    let date = new Date(timestamp);
+    let deltaSeconds = Math.floor((Date.now() - date.getTime()) / 1000);
+    if (isToday(date)) {
+        if (deltaSeconds < 60) {
+            return "Just now";
+        }
+        else if (deltaSeconds < 3600) {
+            let mins = Math.floor(deltaSeconds / 60);
+            return `${mins} ${mins > 1 ? "mins" : "min"} ago`;
+        }
+        else if (deltaSeconds < 3600 * 12) {
+            let hours = Math.floor(deltaSeconds / 3600);
+            return `${hours} ${hours > 1 ? "hours" : "hour"} ago`;
+        }
+        else {
+            return "Earlier today";
+        }
+    }
+    else {
+        if (deltaSeconds < 3600 * 24 * 2) {
+            return "Yesterday";
+        }
+        else if (deltaSeconds < 3600 * 24 * 7) {
+            let days = Math.floor(deltaSeconds / (3600 * 24));
+            return `${days} days ago`;
+        }
+        else {
+            return date.toDateString().slice(4);
+        }
+    }
+}
+export function showRelativeTimes() {
+    let times = document.querySelectorAll("time[datetime]");
+    times.forEach((el) => {
+        el.innerText = formatRelativeTime(el.dateTime);
+    });
+}
@@ -0,0 +1,52 @@
+/**
+ * Return true if date is on the same local calendar day as today.
+ * @param {Date} date Date to check
+ */
+export function isToday(date: Date) {
+  return date.toDateString() == new Date().toDateString();
+}
+
+/**
+ * Format timestamp into human readable string relative to now e.g. "3 mins ago"
+ * @param {string} timestamp ISO8601 timestamp
+ */
+export function formatRelativeTime(timestamp: string) {
+  let date = new Date(timestamp);
+  let deltaSeconds = Math.floor((Date.now() - date.getTime()) / 1000);
+
+  if (isToday(date)) {
+    if (deltaSeconds < 60) {
+      return "Just now";
+    } else if (deltaSeconds < 3600) {
+      let mins = Math.floor(deltaSeconds / 60);
+      return `${mins} ${mins > 1 ? "mins" : "min"} ago`;
+    } else if (deltaSeconds < 3600 * 12) {
+      let hours = Math.floor(deltaSeconds / 3600);
+      return `${hours} ${hours > 1 ? "hours" : "hour"} ago`;
+    } else {
+      return "Earlier today";
+    }
+  } else {
+    if (deltaSeconds < 3600 * 24 * 2) {
+      return "Yesterday";
+    } else if (deltaSeconds < 3600 * 24 * 7) {
+      let days = Math.floor(deltaSeconds / (3600 * 24));
+      return `${days} days ago`;
+    } else {
+      // MMM DD YYYY
+      return date.toDateString().slice(4);
+    }
+  }
+}
+
+/**
+ * Replace the text of every <time> element in the page with the time relative to
+ * now. The server only renders the timestamp, so the page doesn't change over time.
+ */
+export function showRelativeTimes() {
+  let times: NodeListOf<HTMLTimeElement> =
+    document.querySelectorAll("time[datetime]");
+  times.forEach((el) => {
+    el.innerText = formatRelativeTime(el.dateTime);
+  });
+}
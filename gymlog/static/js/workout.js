@@ -1,4 +1,6 @@
+import { isToday, showRelativeTimes } from "./relativeTime.js";
 document.addEventListener("DOMContentLoaded", () => {
+    showRelativeTimes();
     let exercises = document.querySelectorAll("a.exercise-card");
     let offlineSets = JSON.parse(localStorage.getItem("offline-sets")) || [];
     exercises.forEach((el) => {
@@ -9,5 +11,11 @@ document.addEventListener("DOMContentLoaded", () => {
         if (count > 0) {
             el.querySelector("img.offline").classList.remove("hidden");
         }
+        let lastUpdate = el.querySelector("time");
+        if (lastUpdate != null && isToday(new Date(lastUpdate.dateTime))) {
+            el.querySelector(".exercise-last-update").classList.add("today");
+            let icon = el.querySelector("img.exercise-icon");
+            icon.src = icon.dataset.todaySrc;
+        }
     });
 });
@@ -1,4 +1,8 @@
+import { isToday, showRelativeTimes } from "./relativeTime.js";
+
 document.addEventListener("DOMContentLoaded", () => {
+  showRelativeTimes();
+
   let exercises: NodeListOf<HTMLAnchorElement> =
     document.querySelectorAll("a.exercise-card");
   let offlineSets = JSON.parse(localStorage.getItem("offline-sets")) || [];
@@ -10,5 +14,13 @@ document.addEventListener("DOMContentLoaded", () => {
     if (count > 0) {
       el.querySelector("img.offline").classList.remove("hidden");
     }
+
+    // Highlight exercises done today
+    let lastUpdate: HTMLTimeElement = el.querySelector("time");
+    if (lastUpdate != null && isToday(new Date(lastUpdate.dateTime))) {
+      el.querySelector(".exercise-last-update").classList.add("today");
+      let icon: HTMLImageElement = el.querySelector("img.exercise-icon");
+      icon.src = icon.dataset.todaySrc;
+    }
   });
 });
@@ -3,7 +3,15 @@
 /* A version number is useful when updating the worker logic,
    allowing you to remove outdated cache entries during the update.
 */
-const VERSION = 'v3::';
+const VERSION = 'v4::';
+
+/* Static files to precache. The server replaces the placeholder below with a
+   manifest of the fingerprinted URL of each static file, keyed by its plain URL,
+   and a version that changes whenever any static file does. Changing the manifest
+   changes this script, so the browser installs the new worker.
+*/
+const PRECACHE_MANIFEST = self.__PRECACHE_MANIFEST || { version: 'dev', urls: {} };
+const STATIC_CACHE = VERSION + 'static::' + PRECACHE_MANIFEST.version;
 
 /* The install event fires when the service worker is first installed.
    You can use this event to prepare the service worker to be able to serve
@@ -11,6 +19,20 @@ const VERSION = 'v3::';
 */
 self.addEventListener("install", function(event) {
   console.log('Install event fired')
+  event.waitUntil(
+    caches.open(STATIC_CACHE).then(function (cache) {
+      return Promise.all(
+        Object.values(PRECACHE_MANIFEST.urls).map(function (url) {
+          /* Fingerprinted URLs never change, so copy files that are the same as
+             in the previous version from its cache instead of downloading them.
+          */
+          return caches.match(url).then(function (matching) {
+            return matching ? cache.put(url, matching) : cache.add(url);
+          });
+        })
+      );
+    })
+  );
 });
 
 self.addEventListener("fetch", function(event) {
@@ -23,6 +45,22 @@ self.addEventListener("fetch", function(event) {
     */
     return;
   }
+  /* Static files are served from the precache so repeat visits don't download
+     them, but only if the requested version is the one this worker precached.
+     Pages from a newer deploy request newer versions, which must come from the
+     network until the new worker takes over.
+  */
+  let url = new URL(event.request.url);
+  if (url.origin === self.location.origin
+      && Object.hasOwn(PRECACHE_MANIFEST.urls, url.pathname)) {
+    let precacheURL = PRECACHE_MANIFEST.urls[url.pathname];
+    let version = url.searchParams.get('v');
+    if (version === null
+        || version === new URL(precacheURL, url).searchParams.get('v')) {
+      event.respondWith(fromPrecache(event.request, precacheURL));
+      return;
+    }
+  }
   /*
   Respond to fetch events with a time limited network call. 
   If the network fetch takes longer than 4 seconds, fallback to serving the resource from the cache
@@ -64,6 +102,17 @@ function fromNetwork(request, timeout) {
   });
 }
 
+/* Return the current version of a static file from the precache, falling back
+   to the network if it hasn't been cached.
+*/
+function fromPrecache(request, precacheURL) {
+  return caches.open(STATIC_CACHE).then(function (cache) {
+    return cache.match(precacheURL).then(function (matching) {
+      return matching || fetch(request);
+    });
+  });
+}
+
 /* Open the cache where the assets were stored and search for the requested
    resource. If the resource isn't found, then return offline page
 */
@@ -96,8 +145,8 @@ self.addEventListener("activate", function(event) {
         return Promise.all(
           keys
             .filter(function (key) {
-              // Filter by keys that don't start with the latest version prefix.
-              return !key.startsWith(VERSION);
+              // Filter by keys that aren't the latest version's caches.
+              return key !== VERSION + 'cached' && key !== STATIC_CACHE;
             })
             .map(function (key) {
               /* Return a promise that's fulfilled
@@ -2,28 +2,51 @@
 
 import json
 
-from flask import Response, render_template, request, redirect, url_for
+from flask import (
+    Response,
+    jsonify,
+    render_template,
+    request,
+    redirect,
+    stream_with_context,
+    url_for,
+)
 
 from gymlog import app
+from gymlog.assets import SERVICE_WORKER
+from gymlog.export import EXPORT_MIMETYPES, export_sets
+from gymlog.importer import format_from_filename, read_sets
 from gymlog.interfaces import WorkoutInterface
+from gymlog.metrics import render_metrics
+from gymlog.pages import conditional_page
+from gymlog.writer import WriteQueueFull, write
 
-W = WorkoutInterface()
+W = WorkoutInterface(app.config["TIMEZONE"])
+
+# Maximum number of sets returned by each request for a page of an exercise's sets
+MAX_SETS_PAGE_SIZE = 500
+# Maximum number of changes returned by /changes
+MAX_CHANGES_PAGE_SIZE = 2000
 
 
 @app.route("/service-worker.js", methods=["GET"])
 def serviceworker():
     """Make servicer work available at /service-worker.js path instead of from
-    within /static path
+    within /static path, with the precache manifest for the current static files.
 
     Returns
     -------
     Response
-        Response object pointing to service-worker.js
+        Response object containing service-worker.js
     """
-    return app.send_static_file("service-worker.js")
+    response = Response(SERVICE_WORKER, mimetype="text/javascript")
+    response.headers["Cache-Control"] = "no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route("/")
+@conditional_page
 def home():
     """Return homepage
 
@@ -51,7 +74,7 @@ def edit_workout(workoutID: int):
         Rendered HTML template
     """
     all_exercises = W.list_all_exercises()
-    workout_exercises = [ex["name"] for ex in W.list_workout_exercises(workoutID)]
+    workout_exercises = W.list_workout_exercise_names(workoutID)
 
     return render_template(
         "edit_workout.html.jinja",
@@ -64,6 +87,7 @@ def edit_workout(workoutID: int):
 
 @app.route("/workout/", methods=["POST"], defaults={"workoutID": None})
 @app.route("/workout/<int:workoutID>", methods=["GET", "DELETE", "PUT"])
+@conditional_page
 def workout_endpoint(workoutID: int):
     """Workout endpoint
     If the method is GET, return workout page.
@@ -108,6 +132,7 @@ def workout_endpoint(workoutID: int):
 
 @app.route("/exercise/", methods=["POST"], defaults={"exerciseID": None})
 @app.route("/exercise/<int:exerciseID>", methods=["GET", "DELETE"])
+@conditional_page
 def exercise_endpoint(exerciseID: int):
     """Exercise endpoint.
     If the method is GET, return exercise page.
@@ -152,6 +177,53 @@ def exercise_endpoint(exerciseID: int):
         return Response(status=200)
 
 
+@app.route("/exercise/<int:exerciseID>/sets", methods=["GET"])
+def exercise_sets(exerciseID: int):
+    """Return a page of the sets for exercise, most recent first.
+
+    The page is selected using the query string
+    /exercise/1/sets?before=<uid>&limit=<number of sets>
+    where before is the next_before value returned with the previous page.
+
+    Parameters
+    ----------
+    exerciseID : int
+        Exercise ID
+
+    Returns
+    -------
+    Response
+        JSON response containing the sets and the value of before for the next
+        page, which is null for the last page
+    """
+    before = request.args.get("before", type=int)
+    limit = request.args.get("limit", 50, type=int)
+    limit = max(1, min(limit, MAX_SETS_PAGE_SIZE))
+    return jsonify(W.list_exercise_sets_page(exerciseID, before, limit))
+
+
+@app.route("/changes", methods=["GET"])
+def changes():
+    """Return the exercises, workouts and sets that have changed since the client
+    last synced.
+
+    The changes are selected using the query string
+    /changes?since=<seq>&limit=<number of changes>
+    where since is the next value returned by the previous request, or 0 to fetch
+    everything.
+
+    Returns
+    -------
+    Response
+        JSON response containing the changes, the value of since for the next
+        request and whether there are more changes to fetch
+    """
+    since = request.args.get("since", 0, type=int)
+    limit = request.args.get("limit", 500, type=int)
+    limit = max(1, min(limit, MAX_CHANGES_PAGE_SIZE))
+    return jsonify(W.list_changes(since, limit))
+
+
 @app.route("/set/", methods=["POST"], defaults={"setID": None})
 @app.route("/set/<int:setID>", methods=["DELETE", "PUT"])
 def set_endpoint(setID: int):
@@ -171,34 +243,170 @@ def set_endpoint(setID: int):
         Set ID
     """
     if request.method == "POST":
-        post_data = request.form
-        W.save_set(post_data)
+        post_data = request.form.to_dict()
+        try:
+            write(W.save_set, post_data)
+        except ValueError as e:
+            return Response(str(e), status=400)
         return Response(status=200)
 
     elif request.method == "DELETE":
-        W.delete_set(setID)
+        write(W.delete_set, setID)
         return Response(status=200)
 
     elif request.method == "PUT":
-        post_data = request.form
-        W.update_set(setID, post_data)
+        post_data = request.form.to_dict()
+        write(W.update_set, setID, post_data)
         return Response(status=200)
 
 
+@app.route("/sets/", methods=["POST"])
+def sets_endpoint():
+    """Create several new sets at once, e.g. every set of a superset or circuit.
+
+    The sets are sent as a JSON list in the sets form field, with each set in the
+    same format as for POST /set/.
+
+    Returns
+    -------
+    Response
+        JSON response listing the uid of each new set, in the order they were sent,
+        or a 400 response if any set is invalid
+    """
+    try:
+        sets = json.loads(request.form["sets"])
+        uids = write(W.save_sets, sets)
+    except ValueError as e:
+        return Response(str(e), status=400)
+    return jsonify({"uids": uids})
+
+
 @app.route("/sync", methods=["POST"])
 def sync_sets():
     """Sync sets cached when offline to database.
 
     Sets are only added to database there is no other set with the same UUID
-    in the database.
+    in the database. Sets that can't be saved are rejected, so the client can
+    remove them instead of retrying them forever.
 
     Returns
     -------
     Response
-        Response object
+        JSON response listing the UUIDs of the sets that were inserted, the UUIDs
+        of the sets that were duplicates and the UUIDs of the sets that were
+        rejected, or a 400 response if the sets aren't a JSON list
     """
     if request.method == "POST":
         post_data = request.form
-        offline_sets = json.loads(post_data["offline_sets"])
-        W.sync_sets(offline_sets)
-        return Response(status=200)
+        try:
+            offline_sets = json.loads(post_data["offline_sets"])
+        except ValueError as e:
+            return Response(str(e), status=400)
+        if not isinstance(offline_sets, list):
+            return Response("offline_sets must be a list", status=400)
+
+        result = W.sync_sets(offline_sets, app.config["SYNC_CHUNK_SIZE"])
+        return jsonify(result)
+
+
+@app.route("/export", methods=["GET"])
+def export():
+    """Download every set as CSV or newline delimited JSON.
+
+    The format is selected using the query string
+    /export?format=ndjson&gzip=1
+    where format is csv (the default) or ndjson, and gzip compresses the download.
+
+    Sets are streamed from the database as the response is sent, so memory use
+    doesn't depend on the number of sets.
+
+    Returns
+    -------
+    Response
+        Streamed response containing the sets
+    """
+    format_ = request.args.get("format", "csv")
+    if format_ not in EXPORT_MIMETYPES:
+        return Response(f"Unsupported export format: {format_}", status=400)
+
+    compress = request.args.get("gzip", "0") not in ("", "0", "false")
+    filename = f"gym-log-sets.{format_}" + (".gz" if compress else "")
+    mimetype = "application/gzip" if compress else EXPORT_MIMETYPES[format_]
+
+    # Keep the request context, and so the database connection, until the whole
+    # response has been sent
+    body = stream_with_context(export_sets(W.iter_sets_for_export(), format_, compress))
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@app.route("/import", methods=["POST"])
+def import_sets():
+    """Import sets from an uploaded CSV, NDJSON or JSON file, optionally compressed
+    with gzip, in the same format as the export.
+
+    The format is taken from the file name, e.g. sets.csv.gz, unless it is given
+    in the format form field.
+
+    Returns
+    -------
+    Response
+        JSON response with the number of sets inserted, duplicated and invalid, and
+        the names of any exercises created
+    """
+    upload = request.files.get("file")
+    if upload is None:
+        return Response("No file uploaded", status=400)
+
+    filename = upload.filename or ""
+    format_ = request.form.get("format") or format_from_filename(filename)
+    if format_ is None:
+        return Response(f"Unknown import format for {filename}", status=400)
+
+    def log_progress(result):
+        app.logger.info("Imported %d of %d rows", result["inserted"], result["rows"])
+
+    rows = read_sets(upload.stream, format_, filename.lower().endswith(".gz"))
+    try:
+        result = W.import_sets(
+            rows, app.config["IMPORT_CHUNK_SIZE"], progress=log_progress
+        )
+    except ValueError as e:
+        return Response(str(e), status=400)
+
+    return jsonify(result)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Return request metrics for this worker in Prometheus text format
+
+    Returns
+    -------
+    Response
+        Metrics as plain text
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.errorhandler(WriteQueueFull)
+def write_queue_full(e: WriteQueueFull):
+    """Ask client to retry a write later, if the group commit writer is too busy to
+    accept it.
+
+    Parameters
+    ----------
+    e : WriteQueueFull
+        Exception raised when submitting write
+
+    Returns
+    -------
+    Response
+        503 response with a Retry-After header
+    """
+    return Response(
+        "Too many writes, try again", status=503, headers={"Retry-After": "1"}
+    )
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from flask import Flask
+
+from gymlog import app
+from gymlog.metrics import WRITE_BATCH_SIZE, WRITE_QUEUE_DEPTH
+from gymlog.models import database
+
+
+class WriteQueueFull(Exception):
+    """Raised when a write can't be queued because the queue is full"""
+
+
+class GroupCommitWriter:
+    """Background thread that runs writes submitted by request handlers, committing
+    all the writes that arrive within `max_delay` seconds of each other in a single
+    transaction (group commit).
+
+    Each write runs in its own savepoint, so a write that fails doesn't undo the
+    others in its transaction. Writes are acknowledged once the transaction has been
+    committed with synchronous=FULL, so they survive a power loss.
+
+    Parameters
+    ----------
+    flask_app : Flask
+        App to run writes in the context of
+    max_queue : int
+        Maximum number of writes waiting to be committed
+    max_batch : int
+        Maximum number of writes committed in each transaction
+    max_delay : float
+        Time to wait for more writes after the first write of a transaction, in
+        seconds
+    queue_timeout : float
+        Time to wait for space in the queue before giving up, in seconds
+    """
+
+    def __init__(
+        self,
+        flask_app: Flask,
+        max_queue: int,
+        max_batch: int,
+        max_delay: float,
+        queue_timeout: float,
+    ):
+        self.app = flask_app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue_timeout = queue_timeout
+        self._queue: queue.Queue[Tuple[Callable, tuple, Future]] = queue.Queue(
+            max_queue
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def submit(self, function: Callable, *args) -> Any:
+        """Queue write and wait for it to be committed
+
+        Parameters
+        ----------
+        function : Callable
+            Function that writes to the database
+        *args
+            Arguments for function
+
+        Returns
+        -------
+        Any
+            Value returned by function
+
+        Raises
+        ------
+        WriteQueueFull
+            If there is no space in the queue after waiting `queue_timeout` seconds
+        """
+        self._start()
+        future: Future = Future()
+        try:
+            self._queue.put((function, args, future), timeout=self.queue_timeout)
+        except queue.Full:
+            raise WriteQueueFull()
+
+        WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+        return future.result()
+
+    def _start(self) -> None:
+        """Start writer thread if it isn't running in this process.
+
+        The thread is started by the first write rather than on import, so it is
+        started in each gunicorn worker after forking.
+        """
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Commit queued writes in batches, forever"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+            WRITE_BATCH_SIZE.observe(len(batch))
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Callable, tuple, Future]]) -> None:
+        """Run batch of writes in a single transaction, then set the result of each
+        write's future.
+
+        Parameters
+        ----------
+        batch : List[Tuple[Callable, tuple, Future]]
+            Function, arguments and future for each write
+        """
+        results: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        try:
+            with self.app.app_context():
+                synchronous = database.execute_sql("PRAGMA synchronous").fetchone()[0]
+                database.execute_sql("PRAGMA synchronous = FULL")
+                try:
+                    with database.atomic("IMMEDIATE"):
+                        for function, args, future in batch:
+                            try:
+                                with database.atomic():
+                                    results.append((future, function(*args), None))
+                            except Exception as e:
+                                results.append((future, None, e))
+                finally:
+                    database.execute_sql(f"PRAGMA synchronous = {synchronous}")
+        except Exception as e:
+            # The transaction couldn't be committed, so every write failed
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            if not database.is_closed():
+                database.close()
+
+        for future, result, exception in results:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+
+# Group commit writer, disabled unless WRITE_QUEUE_SIZE is greater than 0
+group_commit_writer = (
+    GroupCommitWriter(
+        app,
+        max_queue=app.config["WRITE_QUEUE_SIZE"],
+        max_batch=app.config["WRITE_BATCH_SIZE"],
+        max_delay=app.config["WRITE_BATCH_DELAY_MS"] / 1000,
+        queue_timeout=app.config["WRITE_QUEUE_TIMEOUT"],
+    )
+    if app.config["WRITE_QUEUE_SIZE"] > 0
+    else None
+)
+
+
+def write(function: Callable, *args) -> Any:
+    """Run function that writes to the database, using the group commit writer if
+    it is enabled.
+
+    Parameters
+    ----------
+    function : Callable
+        Function that writes to the database
+    *args
+        Arguments for function
+
+    Returns
+    -------
+    Any
+        Value returned by function
+    """
+    if group_commit_writer is None:
+        return function(*args)
+
+    return group_commit_writer.submit(function, *args)
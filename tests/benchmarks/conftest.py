@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+import pytest
+from peewee import fn
+
+from gymlog import app
+from gymlog.models import Sets, WorkoutExercise
+from tools.generate_dataset import generate_dataset
+
+
+@dataclass
+class Dataset:
+    """Synthetic dataset the benchmarks are run against"""
+
+    sets: int
+    exerciseID: int
+    workoutID: int
+    workout_exerciseIDs: List[int]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("dataset", "synthetic dataset used for benchmarks")
+    group.addoption(
+        "--dataset-years", type=int, default=5, help="Number of years of sets"
+    )
+    group.addoption(
+        "--dataset-sessions-per-day",
+        type=int,
+        default=1,
+        help="Number of workouts logged each day, 17 gives roughly 1M sets",
+    )
+
+
+@pytest.fixture(scope="session")
+def dataset(request) -> Dataset:
+    """Fill the test database with a dataset created by tools/generate_dataset.py,
+    once for all benchmarks.
+
+    The exercise and workout with the most sets are used for benchmarks that need
+    one.
+    """
+    with app.app_context():
+        num_sets = generate_dataset(
+            years=request.config.getoption("dataset_years"),
+            sessions_per_day=request.config.getoption("dataset_sessions_per_day"),
+        )
+        exerciseID = (
+            Sets.select(Sets.exercise)
+            .group_by(Sets.exercise)
+            .order_by(fn.COUNT(Sets.uid).desc())
+            .scalar()
+        )
+        workoutID = (
+            WorkoutExercise.select(WorkoutExercise.workout)
+            .join(Sets, on=(Sets.exercise == WorkoutExercise.exercise))
+            .group_by(WorkoutExercise.workout)
+            .order_by(fn.COUNT(Sets.uid).desc())
+            .scalar()
+        )
+        workout_exerciseIDs = [
+            we.exerciseID
+            for we in WorkoutExercise.select().where(
+                WorkoutExercise.workout == workoutID
+            )
+        ]
+
+    return Dataset(num_sets, exerciseID, workoutID, workout_exerciseIDs)
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    """Run each benchmark, including its setup, in an app context"""
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def measure(benchmark, request, dataset) -> Callable[..., Any]:
+    """Return function that times a function with pytest-benchmark.
+
+    The function is called in a new request context each round, as it would be by a
+    view, so the per-request caches start empty but the process-wide metadata cache
+    is warm. If setup is given, it is called before each round and returns the
+    arguments for function and teardown, which is called after each round to undo
+    any changes made to the database. Neither are timed.
+
+    If trace_memory is true, the function is called once more with tracemalloc
+    running, and the peak memory allocated by Python is saved as peak_memory_kib in
+    the benchmark's extra_info.
+
+    The number of rounds is set by --benchmark-min-rounds.
+    """
+    benchmark.extra_info["sets"] = dataset.sets
+    rounds = request.config.getoption("benchmark_min_rounds")
+
+    def measure(
+        function: Callable[..., Any],
+        setup: Optional[Callable[[], Any]] = None,
+        teardown: Optional[Callable[..., None]] = None,
+        trace_memory: bool = False,
+    ) -> Any:
+        def target(*args):
+            with app.test_request_context():
+                return function(*args)
+
+        result = benchmark.pedantic(
+            target, setup=setup, teardown=teardown, rounds=rounds, warmup_rounds=1
+        )
+
+        if trace_memory:
+            args, _ = setup() if setup is not None else ((), {})
+            tracemalloc.start()
+            try:
+                target(*args)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            benchmark.extra_info["peak_memory_kib"] = round(peak / 1024)
+            if teardown is not None:
+                teardown(*args)
+
+        return result
+
+    return measure
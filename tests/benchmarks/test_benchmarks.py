@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark every public WorkoutInterface method and every route against a synthetic
+dataset created by tools/generate_dataset.py.
+
+Methods and routes that create data are paired with a teardown that deletes it, so
+the database doesn't grow while benchmarking.
+"""
+
+import collections
+import csv
+import datetime
+import io
+import json
+import uuid
+from typing import Any, Callable, Dict, List
+
+import pytest
+from peewee import fn
+
+from gymlog import app
+from gymlog.assets import STATIC_HASHES
+from gymlog.interfaces import WorkoutInterface
+from gymlog.interfaces.workout import EXPORT_COLUMNS
+from gymlog.models import ChangeLog, Exercise, Sets, Workout
+
+W = WorkoutInterface()
+
+# Values for an updated set, covering every exercise type
+UPDATED_SET = {
+    "repetitions": "10",
+    "weight_kg": "25",
+    "distance_m": "1000",
+    "hours": "0",
+    "mins": "5",
+    "seconds": "30",
+}
+
+
+def new_set_data(exerciseID: int) -> Dict[str, str]:
+    """Return form data for a new set for exercise, with values for every exercise
+    type.
+
+    Parameters
+    ----------
+    exerciseID : int
+        Exercise ID
+
+    Returns
+    -------
+    Dict[str, str]
+        Set data as sent by the client
+    """
+    return {
+        "exerciseID": str(exerciseID),
+        "reps": "10",
+        "weight": "25",
+        "distance": "1000",
+        "hours": "0",
+        "mins": "5",
+        "secs": "30",
+        "uuid": str(uuid.uuid4()),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc)
+        .isoformat()
+        .split(".")[0]
+        + "Z",
+    }
+
+
+def import_rows(exerciseID: int, count: int) -> List[Dict[str, str]]:
+    """Return `count` sets for exercise in the import format, with values for every
+    exercise type.
+
+    Parameters
+    ----------
+    exerciseID : int
+        Exercise ID
+    count : int
+        Number of sets
+
+    Returns
+    -------
+    List[Dict[str, str]]
+        Imported sets
+    """
+    exercise = Exercise.get_by_id(exerciseID)
+    return [
+        {
+            "uuid": str(uuid.uuid4()),
+            "exercise": exercise.name,
+            "datetime": f"2000-01-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            **{k: "1" for k in ("distance_m", "weight_kg", "repetitions", "time_s")},
+        }
+        for i in range(count)
+    ]
+
+
+def delete_sets(sets: List[Dict[str, Any]], *args) -> None:
+    """Delete sets created by a benchmark, as a teardown function for
+    pytest-benchmark.
+
+    Parameters
+    ----------
+    sets : List[Dict[str, Any]]
+        Data for each set, which must include its uuid
+    *args
+        Any other arguments of the benchmarked function
+    """
+    Sets.delete().where(Sets.uuid.in_([s["uuid"] for s in sets])).execute()
+    W.rebuild_exercise_stats()
+
+
+def request(method: str, url: str, **kwargs) -> Callable[..., None]:
+    """Return function that makes a request with the Flask test client
+
+    Parameters
+    ----------
+    method : str
+        HTTP method
+    url : str
+        URL to request
+    **kwargs
+        Keyword arguments for the test client
+
+    Returns
+    -------
+    Callable[..., None]
+        Function making the request, which raises an exception if the response is an
+        error
+    """
+    client = app.test_client()
+
+    def run(*args):
+        response = client.open(url, method=method, **kwargs)
+        # Read streamed responses to the end
+        response.get_data()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}")
+
+    return run
+
+
+def stream(url: str, first_chunk: bool = False) -> Callable[[], None]:
+    """Return function that requests a streamed response with the Flask test client
+    and reads it a chunk at a time, without keeping the chunks.
+
+    Parameters
+    ----------
+    url : str
+        URL to request
+    first_chunk : bool, optional
+        Stop after reading the first chunk, to time how long the client waits for
+        the response to start
+
+    Returns
+    -------
+    Callable[[], None]
+        Function making the request, which raises an exception if the response is an
+        error
+    """
+    client = app.test_client()
+
+    def run():
+        response = client.get(url, buffered=False)
+        try:
+            if response.status_code >= 400:
+                raise RuntimeError(f"GET {url} returned {response.status_code}")
+            for _ in response.response:
+                if first_chunk:
+                    break
+        finally:
+            response.close()
+
+    return run
+
+
+@pytest.mark.benchmark(group="methods")
+class TestMethods:
+    def test_get_workout_name(self, measure, dataset):
+        measure(lambda: W.get_workout_name(dataset.workoutID))
+
+    def test_get_workout_colour(self, measure, dataset):
+        measure(lambda: W.get_workout_colour(dataset.workoutID))
+
+    def test_get_exercise_name(self, measure, dataset):
+        measure(lambda: W.get_exercise_name(dataset.exerciseID))
+
+    def test_get_exercise_type(self, measure, dataset):
+        measure(lambda: W.get_exercise_type(dataset.exerciseID))
+
+    def test_list_workouts(self, measure):
+        measure(W.list_workouts)
+
+    def test_list_all_exercises(self, measure):
+        measure(W.list_all_exercises)
+
+    def test_list_workout_exercise_names(self, measure, dataset):
+        measure(lambda: W.list_workout_exercise_names(dataset.workoutID))
+
+    def test_list_workout_exercises(self, measure, dataset):
+        measure(lambda: W.list_workout_exercises(dataset.workoutID))
+
+    def test_list_todays_exercise_sets(self, measure, dataset):
+        measure(lambda: W.list_todays_exercise_sets(dataset.exerciseID))
+
+    def test_list_exercise_sets_between(self, measure, dataset):
+        until = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+        since = until - 90 * 24 * 3600
+        measure(lambda: W.list_exercise_sets_between(dataset.exerciseID, since, until))
+
+    def test_list_exercise_sets_page(self, measure, dataset):
+        measure(lambda: W.list_exercise_sets_page(dataset.exerciseID))
+
+    def test_list_exercise_sets_page_before(self, measure, dataset):
+        oldest_uid = (
+            Sets.select(fn.MIN(Sets.uid))
+            .where(Sets.exercise == dataset.exerciseID)
+            .scalar()
+        )
+        measure(lambda: W.list_exercise_sets_page(dataset.exerciseID, oldest_uid + 50))
+
+    def test_iter_sets_for_export(self, measure):
+        measure(
+            lambda: collections.deque(W.iter_sets_for_export(), maxlen=0),
+            trace_memory=True,
+        )
+
+    def test_list_changes(self, measure):
+        measure(lambda: W.list_changes(0))
+
+    def test_list_changes_last_100(self, measure):
+        latest_seq = ChangeLog.select(fn.MAX(ChangeLog.seq)).scalar()
+        measure(lambda: W.list_changes(latest_seq - 100))
+
+    def test_get_exercise_history(self, measure, dataset):
+        measure(lambda: W.get_exercise_history(dataset.exerciseID))
+
+    def test_get_exercise_stats(self, measure, dataset):
+        measure(lambda: W.get_exercise_stats(dataset.exerciseID))
+
+    def test_get_exercise_last_set(self, measure, dataset):
+        measure(lambda: W.get_exercise_last_set(dataset.exerciseID))
+
+    def test_today(self, measure):
+        measure(W.today)
+
+    def test_rebuild_exercise_stats(self, measure):
+        measure(W.rebuild_exercise_stats)
+
+    def test_save_set_and_delete_set(self, measure, dataset):
+        def save_and_delete_set(set_):
+            W.save_set(set_)
+            W.delete_set(Sets.get(Sets.uuid == set_["uuid"]).uid)
+
+        measure(
+            save_and_delete_set,
+            setup=lambda: ((new_set_data(dataset.exerciseID),), {}),
+        )
+
+    def test_update_set(self, measure, dataset):
+        latest_uid = (
+            Sets.select(fn.MAX(Sets.uid))
+            .where(Sets.exercise == dataset.exerciseID)
+            .scalar()
+        )
+        measure(lambda: W.update_set(latest_uid, UPDATED_SET))
+
+    def test_save_sets_10(self, measure, dataset):
+        measure(
+            W.save_sets,
+            setup=lambda: (
+                ([new_set_data(dataset.exerciseID) for _ in range(10)],),
+                {},
+            ),
+            teardown=delete_sets,
+        )
+
+    def test_sync_sets_100(self, measure, dataset):
+        measure(
+            W.sync_sets,
+            setup=lambda: (
+                ([new_set_data(dataset.exerciseID) for _ in range(100)],),
+                {},
+            ),
+            teardown=delete_sets,
+        )
+
+    def test_import_sets_1000(self, measure, dataset):
+        measure(
+            W.import_sets,
+            setup=lambda: ((import_rows(dataset.exerciseID, 1000),), {}),
+            teardown=delete_sets,
+        )
+
+    def test_save_workout(self, measure, dataset):
+        workout_data = {
+            "name": W.get_workout_name(dataset.workoutID),
+            "exerciseIDs": dataset.workout_exerciseIDs,
+        }
+        measure(lambda: W.save_workout(dataset.workoutID, workout_data))
+
+    def test_new_exercise_and_delete_exercise(self, measure):
+        def new_and_delete_exercise():
+            W.new_exercise("Benchmark exercise", "time")
+            W.delete_exercise(Exercise.select(fn.MAX(Exercise.exercise_id)).scalar())
+
+        measure(new_and_delete_exercise)
+
+    def test_new_workout_and_delete_workout(self, measure):
+        def new_and_delete_workout():
+            W.new_workout("Benchmark workout", "#8e1914")
+            W.delete_workout(Workout.select(fn.MAX(Workout.workout_id)).scalar())
+
+        measure(new_and_delete_workout)
+
+
+@pytest.mark.benchmark(group="routes")
+class TestRoutes:
+    def test_get_home(self, measure):
+        measure(request("GET", "/"))
+
+    def test_get_workout(self, measure, dataset):
+        measure(request("GET", f"/workout/{dataset.workoutID}"))
+
+    def test_get_exercise(self, measure, dataset):
+        url = f"/exercise/{dataset.exerciseID}?workoutID={dataset.workoutID}"
+        measure(request("GET", url))
+
+    def test_get_exercise_if_none_match(self, measure, dataset):
+        url = f"/exercise/{dataset.exerciseID}?workoutID={dataset.workoutID}"
+        etag = app.test_client().get(url).headers["ETag"]
+        measure(request("GET", url, headers={"If-None-Match": etag}))
+
+    def test_get_exercise_sets(self, measure, dataset):
+        measure(request("GET", f"/exercise/{dataset.exerciseID}/sets"))
+
+    def test_get_changes(self, measure):
+        measure(request("GET", "/changes?since=0"))
+
+    @pytest.mark.parametrize(
+        "query",
+        ["format=csv", "format=ndjson", "format=csv&gzip=1", "format=ndjson&gzip=1"],
+    )
+    def test_get_export(self, measure, query):
+        measure(stream(f"/export?{query}"), trace_memory=True)
+
+    def test_get_export_first_chunk(self, measure):
+        measure(stream("/export?format=ndjson", first_chunk=True))
+
+    def test_get_edit_workout(self, measure, dataset):
+        measure(request("GET", f"/edit-workout/{dataset.workoutID}"))
+
+    def test_get_service_worker(self, measure):
+        measure(request("GET", "/service-worker.js"))
+
+    def test_get_static(self, measure):
+        filename, hash_ = next(iter(STATIC_HASHES.items()))
+        measure(request("GET", f"/static/{filename}?v={hash_}"))
+
+    def test_get_metrics(self, measure):
+        measure(request("GET", "/metrics"))
+
+    def test_post_set_and_delete_set(self, measure, dataset):
+        def post_and_delete_set(set_):
+            request("POST", "/set/", data=set_)()
+            uid = Sets.get(Sets.uuid == set_["uuid"]).uid
+            request("DELETE", f"/set/{uid}")()
+
+        measure(
+            post_and_delete_set,
+            setup=lambda: ((new_set_data(dataset.exerciseID),), {}),
+        )
+
+    def test_put_set(self, measure, dataset):
+        latest_uid = (
+            Sets.select(fn.MAX(Sets.uid))
+            .where(Sets.exercise == dataset.exerciseID)
+            .scalar()
+        )
+        measure(request("PUT", f"/set/{latest_uid}", data=UPDATED_SET))
+
+    def test_post_sets_10(self, measure, dataset):
+        def post_sets(sets):
+            request("POST", "/sets/", data={"sets": json.dumps(sets)})()
+
+        measure(
+            post_sets,
+            setup=lambda: (
+                ([new_set_data(dataset.exerciseID) for _ in range(10)],),
+                {},
+            ),
+            teardown=delete_sets,
+        )
+
+    def test_post_sync_100(self, measure, dataset):
+        def sync_sets(offline_sets):
+            request("POST", "/sync", data={"offline_sets": json.dumps(offline_sets)})()
+
+        measure(
+            sync_sets,
+            setup=lambda: (
+                ([new_set_data(dataset.exerciseID) for _ in range(100)],),
+                {},
+            ),
+            teardown=delete_sets,
+        )
+
+    def test_post_import_1000(self, measure, dataset):
+        def import_csv(rows, body):
+            data = {"file": (io.BytesIO(body), "sets.csv")}
+            request("POST", "/import", data=data)()
+
+        def setup():
+            rows = import_rows(dataset.exerciseID, 1000)
+            body = io.StringIO()
+            writer = csv.DictWriter(body, EXPORT_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+            return (rows, body.getvalue().encode()), {}
+
+        measure(import_csv, setup=setup, teardown=delete_sets)
+
+    def test_put_workout(self, measure, dataset):
+        workout_data = {
+            "workout": json.dumps(
+                {
+                    "name": W.get_workout_name(dataset.workoutID),
+                    "exerciseIDs": dataset.workout_exerciseIDs,
+                }
+            )
+        }
+        measure(request("PUT", f"/workout/{dataset.workoutID}", data=workout_data))
+
+    def test_post_exercise_and_delete_exercise(self, measure):
+        def post_and_delete_exercise():
+            request("POST", "/exercise/", data={"name": "Benchmark", "type": "time"})()
+            latest = Exercise.select(fn.MAX(Exercise.exercise_id)).scalar()
+            request("DELETE", f"/exercise/{latest}")()
+
+        measure(post_and_delete_exercise)
+
+    def test_post_workout_and_delete_workout(self, measure):
+        def post_and_delete_workout():
+            data = {"name": "Benchmark", "colour": "#8e1914"}
+            request("POST", "/workout/", data=data)()
+            latest = Workout.select(fn.MAX(Workout.workout_id)).scalar()
+            request("DELETE", f"/workout/{latest}")()
+
+        measure(post_and_delete_workout)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import pytest
+
+# The database must be configured before gymlog is imported
+_database_dir = tempfile.mkdtemp(prefix="gymlog-test-")
+os.environ["GYMLOG_DATABASE"] = os.path.join(_database_dir, "gym-log.db")
+
+from gymlog import app  # noqa: E402
+from gymlog.models import database  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Run test in a transaction that is rolled back afterwards, so each test starts
+    with an empty database."""
+    with app.app_context():
+        with database.atomic() as transaction:
+            yield database
+            transaction.rollback()
+
+
+@pytest.fixture
+def client():
+    """Test client for requests that don't change the database, which can't run
+    inside the db fixture's transaction"""
+    return app.test_client()
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """Record the SQL of every query run inside the context
+
+    Yields
+    ------
+    List[str]
+        SQL of each query, appended to as queries are run
+    """
+    queries: List[str] = []
+
+    def record(sql: str, duration: float) -> None:
+        queries.append(sql)
+
+    database.timing_hooks.append(record)
+    try:
+        yield queries
+    finally:
+        database.timing_hooks.remove(record)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import datetime
+import json
+
+import pytest
+
+from gymlog.interfaces import WorkoutInterface
+from gymlog.models import Exercise, ExerciseStatistics, Sets
+
+W = WorkoutInterface()
+
+
+@pytest.mark.parametrize("timestamp", ["yesterday", "2024-13-01T00:00:00Z", 1700000000])
+def test_set_row_rejects_malformed_timestamp(timestamp):
+    with pytest.raises(ValueError, match="Invalid timestamp"):
+        W._set_row_from_post_data({"exerciseID": "1", "timestamp": timestamp})
+
+
+def test_malformed_timestamp_is_client_error(client):
+    set_ = {"exerciseID": "1", "reps": "5", "timestamp": "not a date"}
+
+    response = client.post("/set/", data=set_)
+    assert response.status_code == 400
+
+    response = client.post("/sets/", data={"sets": json.dumps([set_])})
+    assert response.status_code == 400
+
+    response = client.post("/sync", data={"offline_sets": "not json"})
+    assert response.status_code == 400
+
+
+def test_exercise_stats_year_window_rolls_once(db, monkeypatch):
+    exercise = Exercise.create(name="Plank", type_="time")
+    now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+    for day in range(0, 400, 10):
+        Sets.create(
+            uuid=f"plank-{day}",
+            datetime="2024-01-01T00:00:00Z",
+            epoch_s=now - day * 86400,
+            exercise=exercise,
+            time_s=day + 1,
+        )
+
+    # Store statistics for a year window that started 30 days earlier
+    year_start = W._year_start_epoch()
+    monkeypatch.setattr(W, "_year_start_epoch", lambda: year_start - 30 * 86400)
+    W._refresh_exercise_stats(exercise.exercise_id)
+    monkeypatch.undo()
+
+    expected = sum(
+        day + 1 for day in range(0, 400, 10) if now - day * 86400 >= year_start
+    )
+    for _ in range(2):
+        stats = W._get_exercise_statistics(exercise.exercise_id)
+        assert stats.year_total == expected
+        assert stats.year_start_s == year_start
+
+    stored = ExerciseStatistics.get(ExerciseStatistics.exercise == exercise)
+    assert stored.year_total == expected
+
+
+def test_sync_sets_rejects_sets_that_cant_be_saved(db):
+    exercise = Exercise.create(name="Squat", type_="weight-repetitions")
+    deleted = Exercise.create(name="Deleted", type_="weight-repetitions")
+    deleted_id = deleted.exercise_id
+    deleted.delete_instance()
+    Sets.create(
+        uuid="existing",
+        datetime="2024-01-01T00:00:00Z",
+        epoch_s=1704067200,
+        exercise=exercise,
+        weight_kg=100,
+        repetitions=5,
+    )
+
+    def set_(uuid_, exerciseID=exercise.exercise_id, timestamp="2024-01-02T00:00:00Z"):
+        return {
+            "uuid": uuid_,
+            "exerciseID": exerciseID,
+            "timestamp": timestamp,
+            "weight": "100",
+            "reps": "5",
+        }
+
+    offline_sets = [
+        set_("new-1"),
+        set_("deleted-exercise", exerciseID=deleted_id),
+        set_("existing"),
+        set_("no-exercise", exerciseID=None),
+        set_("bad-timestamp", timestamp="not a date"),
+        set_("new-2", exerciseID=str(exercise.exercise_id)),
+    ]
+    result = W.sync_sets(offline_sets, chunk_size=2)
+
+    assert result == {
+        "inserted": ["new-1", "new-2"],
+        "duplicates": ["existing"],
+        "rejected": ["no-exercise", "bad-timestamp", "deleted-exercise"],
+    }
+    assert Sets.select().where(Sets.uuid.in_(["new-1", "new-2"])).count() == 2
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import datetime
+from typing import List
+
+import pytest
+
+from gymlog.interfaces import WorkoutInterface
+from gymlog.models import Exercise, Sets, Workout, WorkoutExercise
+
+from conftest import count_queries
+
+W = WorkoutInterface()
+
+
+def add_workouts(
+    count: int, exercises_per_workout: int, sets_per_exercise: int, first: int = 0
+):
+    """Add workouts numbered from `first`, each with its own exercises and sets"""
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    for w in range(first, first + count):
+        workout = Workout.create(name=f"Workout {w}", colour="#000")
+        for e in range(exercises_per_workout):
+            exercise = Exercise.create(name=f"Exercise {w}-{e}", type_="time")
+            WorkoutExercise.create(workout=workout, exercise=exercise)
+            for s in range(sets_per_exercise):
+                timestamp = start + datetime.timedelta(days=s, minutes=w * 10 + e)
+                Sets.create(
+                    uuid=f"{w}-{e}-{s}",
+                    datetime=timestamp.isoformat().replace("+00:00", "Z"),
+                    epoch_s=int(timestamp.timestamp()),
+                    exercise=exercise,
+                    time_s=60,
+                )
+
+
+def test_list_workouts_query_count_is_constant(db):
+    add_workouts(2, exercises_per_workout=2, sets_per_exercise=3)
+    with count_queries() as queries:
+        W.list_workouts()
+    few_workouts = len(queries)
+
+    add_workouts(20, exercises_per_workout=2, sets_per_exercise=3, first=2)
+    with count_queries() as queries:
+        workouts = W.list_workouts()
+
+    assert len(workouts) == 22
+    assert len(queries) == few_workouts
+
+
+def test_list_workouts_latest_set(db):
+    add_workouts(2, exercises_per_workout=3, sets_per_exercise=4)
+    Workout.create(name="Empty", colour="#fff")
+
+    workouts = {w["name"]: w for w in W.list_workouts()}
+
+    # The last exercise of each workout has the latest set, on the 4th day
+    assert workouts["Workout 1"]["exercise_count"] == 3
+    assert workouts["Workout 1"]["last_exercise"] == "Exercise 1-2"
+    assert workouts["Workout 1"]["last_update"] == "2024-01-04T00:12:00Z"
+    assert workouts["Empty"]["exercise_count"] == 0
+    assert workouts["Empty"]["last_update"] is None
+    assert workouts["Empty"]["last_exercise"] == ""
+
+
+def test_list_workout_exercises_query_count_is_constant(db):
+    add_workouts(1, exercises_per_workout=2, sets_per_exercise=2)
+    add_workouts(1, exercises_per_workout=10, sets_per_exercise=30, first=1)
+    small, large = [w.workout_id for w in Workout.select().order_by(Workout.name)]
+
+    with count_queries() as queries:
+        W.list_workout_exercises(small)
+    small_queries = len(queries)
+
+    with count_queries() as queries:
+        exercises = W.list_workout_exercises(large)
+
+    assert len(exercises) == 10
+    assert len(queries) == small_queries
+
+
+def test_list_workout_exercises_latest_set(db):
+    add_workouts(1, exercises_per_workout=2, sets_per_exercise=3)
+    workout = Workout.get()
+    empty = Exercise.create(name="No sets", type_="time")
+    WorkoutExercise.create(workout=workout, exercise=empty)
+
+    exercises = {e["name"]: e for e in W.list_workout_exercises(workout.workout_id)}
+
+    assert exercises["Exercise 0-1"]["last_update"] == "2024-01-03T00:01:00Z"
+    assert exercises["No sets"]["last_update"] is None
+
+
+def add_sets(exercise: Exercise, start: int, weights: List[float]):
+    """Add a set for exercise for each weight, a minute apart from `start`"""
+    for i, weight in enumerate(weights):
+        epoch_s = start + i * 60
+        timestamp = datetime.datetime.fromtimestamp(epoch_s, datetime.timezone.utc)
+        Sets.create(
+            uuid=f"{exercise.exercise_id}-{epoch_s}",
+            datetime=timestamp.isoformat().replace("+00:00", "Z"),
+            epoch_s=epoch_s,
+            exercise=exercise,
+            weight_kg=weight,
+            repetitions=5,
+        )
+
+
+def test_list_todays_exercise_sets_query_count_is_constant(db):
+    today_start, _ = W._local_day_bounds(W.today())
+    exercise = Exercise.create(name="Squat", type_="weight-repetitions")
+    add_sets(exercise, today_start - 86400, [80, 90])
+    add_sets(exercise, today_start, [100])
+
+    with count_queries() as queries:
+        assert len(W.list_todays_exercise_sets(exercise.exercise_id)) == 1
+    one_set = len(queries)
+
+    add_sets(exercise, today_start + 60, [100 + i for i in range(30)])
+    with count_queries() as queries:
+        assert len(W.list_todays_exercise_sets(exercise.exercise_id)) == 31
+
+    assert len(queries) == one_set
+
+
+def test_list_todays_exercise_sets_deltas(db):
+    today_start, _ = W._local_day_bounds(W.today())
+    exercise = Exercise.create(name="Bench press", type_="weight-repetitions")
+    other = Exercise.create(name="Deadlift", type_="weight-repetitions")
+    add_sets(exercise, today_start - 5 * 86400, [60, 70])
+    add_sets(exercise, today_start - 86400, [80])
+    add_sets(other, today_start - 600, [200])
+    add_sets(exercise, today_start, [100, 100, 90, 95])
+
+    # Brute force: each set's delta is from the set logged before it
+    all_sets = list(Sets.select().where(Sets.exercise == exercise).order_by(Sets.uid))
+    expected = []
+    for previous, current in zip(all_sets, all_sets[1:]):
+        if current.epoch_s >= today_start:
+            change = (current.weight_kg - previous.weight_kg) / previous.weight_kg
+            expected.append((current.uid, change * 100 or None))
+
+    sets = W.list_todays_exercise_sets(exercise.exercise_id)
+
+    # Most recent first, and the first set of the day is compared with yesterday's
+    assert [(s["uid"], s["delta"]) for s in sets] == expected[::-1]
+    assert sets[-1]["delta"] == pytest.approx(25)
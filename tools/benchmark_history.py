@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark WorkoutInterface.get_exercise_history against a temporary database
+containing a single exercise with a long history.
+
+Usage:
+    python tools/benchmark_history.py --sets 10000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import timeit
+import uuid
+
+# Create the database in a temporary directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["GYMLOG_DATABASE"] = os.path.join(tempfile.mkdtemp(), "gym-log.db")
+
+from gymlog.interfaces import WorkoutInterface  # noqa: E402
+from gymlog.models import database, Exercise, Sets  # noqa: E402
+
+
+def populate(num_sets: int, sets_per_day: int) -> int:
+    """Create weight-repetitions exercise with `num_sets` sets, logged
+    `sets_per_day` at a time going back from today.
+
+    Parameters
+    ----------
+    num_sets : int
+        Number of sets to create
+    sets_per_day : int
+        Number of sets logged each day
+
+    Returns
+    -------
+    int
+        Exercise ID
+    """
+    exercise = Exercise.create(name="Chest press", type_="weight-repetitions")
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+    rows = []
+    for i in range(num_sets):
+        dt = now - datetime.timedelta(days=i // sets_per_day, minutes=i % sets_per_day)
+        rows.append(
+            {
+                "datetime": dt.isoformat().replace("+00:00", "Z"),
+                "epoch_s": int(dt.timestamp()),
+                "exercise": exercise.exercise_id,
+                "repetitions": random.randint(5, 12),
+                "weight_kg": random.choice([20.0, 22.5, 25.0, 27.5, 30.0]),
+                "uuid": str(uuid.uuid4()),
+            }
+        )
+
+    with database.atomic():
+        for i in range(0, len(rows), 500):
+            Sets.insert_many(rows[i : i + 500]).execute()
+
+    return exercise.exercise_id
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark exercise history")
+    parser.add_argument("--sets", type=int, default=10000, help="Number of sets")
+    parser.add_argument("--per-day", type=int, default=5, help="Sets per day")
+    parser.add_argument("--repeat", type=int, default=50, help="Number of calls")
+    args = parser.parse_args()
+
+    exerciseID = populate(args.sets, args.per_day)
+    W = WorkoutInterface()
+
+    timings = timeit.repeat(
+        lambda: W.get_exercise_history(exerciseID), number=1, repeat=args.repeat
+    )
+    timings.sort()
+    print(f"get_exercise_history with {args.sets} sets, {args.repeat} calls")
+    print(f"  min:    {timings[0] * 1000:.2f} ms")
+    print(f"  median: {timings[len(timings) // 2] * 1000:.2f} ms")
+    print(f"  max:    {timings[-1] * 1000:.2f} ms")
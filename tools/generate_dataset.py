@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+"""
+Generate a database filled with synthetic workouts, exercises and sets covering
+multiple years, for benchmarking.
+
+Each day, `--sessions-per-day` randomly chosen workouts are logged. Each exercise in
+a logged workout gets `--sets-per-exercise` sets. The defaults give roughly 60,000
+sets; increase them for larger databases e.g.
+
+    python tools/generate_dataset.py data/bench.db --sessions-per-day 17
+
+gives roughly 1M sets.
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import uuid
+from typing import Any, Dict, List
+
+# The database must be configured before gymlog is imported
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic database")
+    parser.add_argument("database", help="Path to database file to create")
+    parser.add_argument("--workouts", type=int, default=50, help="Number of workouts")
+    parser.add_argument(
+        "--exercises", type=int, default=200, help="Number of exercises"
+    )
+    parser.add_argument(
+        "--exercises-per-workout",
+        type=int,
+        default=8,
+        help="Number of exercises in each workout",
+    )
+    parser.add_argument("--years", type=int, default=5, help="Number of years")
+    parser.add_argument(
+        "--sessions-per-day",
+        type=int,
+        default=1,
+        help="Number of workouts logged each day",
+    )
+    parser.add_argument(
+        "--sets-per-exercise",
+        type=int,
+        default=4,
+        help="Number of sets logged for each exercise in a workout",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        sys.exit(f"{args.database} already exists")
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ["GYMLOG_DATABASE"] = args.database
+
+import peewee as pw  # noqa: E402
+
+from gymlog.interfaces import WorkoutInterface  # noqa: E402
+from gymlog.models import (  # noqa: E402
+    database,
+    ChangeLog,
+    Exercise,
+    Sets,
+    Workout,
+    WorkoutExercise,
+)
+
+EXERCISE_TYPES = ["weight-repetitions"] * 3 + ["distance-time", "time"]
+COLOURS = ["#8e1914", "#6a6912", "#966b17", "#305d5f", "#7b445d", "#954109", "#486d4a"]
+INSERT_CHUNK_SIZE = 500
+
+
+def create_exercises(rng: random.Random, num_exercises: int) -> List[Exercise]:
+    """Create exercises with a mix of types
+
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator
+    num_exercises : int
+        Number of exercises to create
+
+    Returns
+    -------
+    List[Exercise]
+        Created exercises
+    """
+    return [
+        Exercise.create(name=f"Exercise {i}", type_=rng.choice(EXERCISE_TYPES))
+        for i in range(num_exercises)
+    ]
+
+
+def create_workouts(
+    rng: random.Random,
+    num_workouts: int,
+    exercises: List[Exercise],
+    exercises_per_workout: int,
+) -> Dict[int, List[Exercise]]:
+    """Create workouts, each with a random selection of exercises
+
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator
+    num_workouts : int
+        Number of workouts to create
+    exercises : List[Exercise]
+        Exercises to choose from
+    exercises_per_workout : int
+        Number of exercises in each workout
+
+    Returns
+    -------
+    Dict[int, List[Exercise]]
+        Exercises in each workout, keyed by workout ID
+    """
+    workouts = {}
+    for i in range(num_workouts):
+        workout = Workout.create(name=f"Workout {i}", colour=rng.choice(COLOURS))
+        chosen = rng.sample(exercises, min(exercises_per_workout, len(exercises)))
+        WorkoutExercise.insert_many(
+            [{"workout": workout.workout_id, "exercise": e.exercise_id} for e in chosen]
+        ).execute()
+        workouts[workout.workout_id] = chosen
+
+    return workouts
+
+
+def random_set(
+    rng: random.Random, exercise: Exercise, progress: float
+) -> Dict[str, Any]:
+    """Return values for a set of the given exercise
+
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator
+    exercise : Exercise
+        Exercise the set is for
+    progress : float
+        Fraction of the way through the dataset, used to increase values over time
+
+    Returns
+    -------
+    Dict[str, Any]
+        Sets field names and values
+    """
+    if exercise.type_ == "weight-repetitions":
+        return {
+            "weight_kg": round((20 + 40 * progress + rng.uniform(-5, 5)) * 2) / 2,
+            "repetitions": rng.randint(5, 12),
+        }
+    elif exercise.type_ == "distance-time":
+        distance = rng.choice([1000, 2000, 5000, 10000])
+        return {
+            "distance_m": distance,
+            "time_s": int(distance / (2.5 + progress + rng.uniform(-0.3, 0.3))),
+        }
+    else:
+        return {"time_s": rng.randint(30, 120) + int(120 * progress)}
+
+
+def create_sets(
+    rng: random.Random,
+    workouts: Dict[int, List[Exercise]],
+    years: int,
+    sessions_per_day: int,
+    sets_per_exercise: int,
+) -> int:
+    """Create sets for randomly chosen workouts every day for `years` years, up to
+    now.
+
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator
+    workouts : Dict[int, List[Exercise]]
+        Exercises in each workout, keyed by workout ID
+    years : int
+        Number of years of sets
+    sessions_per_day : int
+        Number of workouts logged each day
+    sets_per_exercise : int
+        Number of sets logged for each exercise in a workout
+
+    Returns
+    -------
+    int
+        Number of sets created
+    """
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    today = now.replace(hour=0, minute=0, second=0)
+    num_days = 365 * years
+    workoutIDs = list(workouts.keys())
+    rows = []
+    count = 0
+
+    for day in range(num_days, -1, -1):
+        progress = 1 - day / num_days
+        for workoutID in rng.sample(workoutIDs, min(sessions_per_day, len(workoutIDs))):
+            dt = today - datetime.timedelta(days=day, hours=-rng.randint(6, 20))
+            for exercise in workouts[workoutID]:
+                for _ in range(sets_per_exercise):
+                    dt += datetime.timedelta(seconds=rng.randint(60, 240))
+                    if dt > now:
+                        break
+                    # insert_many takes the columns from the first row, so every
+                    # row must have every column
+                    rows.append(
+                        {
+                            "datetime": dt.isoformat().replace("+00:00", "Z"),
+                            "epoch_s": int(dt.timestamp()),
+                            "exercise": exercise.exercise_id,
+                            "uuid": str(uuid.UUID(int=rng.getrandbits(128))),
+                            "distance_m": None,
+                            "weight_kg": None,
+                            "repetitions": None,
+                            "time_s": None,
+                            **random_set(rng, exercise, progress),
+                        }
+                    )
+
+        if len(rows) >= INSERT_CHUNK_SIZE:
+            count += insert_sets(rows)
+            rows = []
+
+    count += insert_sets(rows)
+    return count
+
+
+def insert_sets(rows: List[Dict[str, Any]]) -> int:
+    """Insert rows into sets table
+
+    Parameters
+    ----------
+    rows : List[Dict[str, Any]]
+        Sets field names and values
+
+    Returns
+    -------
+    int
+        Number of rows inserted
+    """
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        Sets.insert_many(rows[i : i + INSERT_CHUNK_SIZE]).execute()
+    return len(rows)
+
+
+def log_changes() -> None:
+    """Add an upsert to the change log for every exercise, workout and set, as if
+    they had been created by the app."""
+    fields = [ChangeLog.entity, ChangeLog.entity_id, ChangeLog.operation]
+    for entity, id_field in (
+        ("exercise", Exercise.exercise_id),
+        ("workout", Workout.workout_id),
+        ("set", Sets.uid),
+    ):
+        query = id_field.model.select(
+            pw.Value(entity), id_field, pw.Value("upsert")
+        ).order_by(id_field)
+        ChangeLog.insert_from(query, fields).execute()
+
+
+def generate_dataset(
+    seed: int = 0,
+    num_workouts: int = 50,
+    num_exercises: int = 200,
+    exercises_per_workout: int = 8,
+    years: int = 5,
+    sessions_per_day: int = 1,
+    sets_per_exercise: int = 4,
+) -> int:
+    """Fill the database with synthetic workouts, exercises and sets, and store the
+    statistics for each exercise.
+
+    Parameters
+    ----------
+    seed : int, optional
+        Random seed
+    num_workouts : int, optional
+        Number of workouts
+    num_exercises : int, optional
+        Number of exercises
+    exercises_per_workout : int, optional
+        Number of exercises in each workout
+    years : int, optional
+        Number of years of sets
+    sessions_per_day : int, optional
+        Number of workouts logged each day
+    sets_per_exercise : int, optional
+        Number of sets logged for each exercise in a workout
+
+    Returns
+    -------
+    int
+        Number of sets created
+    """
+    rng = random.Random(seed)
+    with database.atomic():
+        exercises = create_exercises(rng, num_exercises)
+        workouts = create_workouts(rng, num_workouts, exercises, exercises_per_workout)
+        num_sets = create_sets(
+            rng, workouts, years, sessions_per_day, sets_per_exercise
+        )
+        log_changes()
+
+    WorkoutInterface().rebuild_exercise_stats()
+    return num_sets
+
+
+if __name__ == "__main__":
+    num_sets = generate_dataset(
+        args.seed,
+        args.workouts,
+        args.exercises,
+        args.exercises_per_workout,
+        args.years,
+        args.sessions_per_day,
+        args.sets_per_exercise,
+    )
+    print(
+        f"Created {args.database} with {args.workouts} workouts, "
+        f"{args.exercises} exercises and {num_sets} sets"
+    )
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+
+"""
+Load test a running gym log server with several simulated phones at once, using
+the mix of requests the app makes in normal use:
+    - loading the homepage
+    - opening a workout and viewing its exercises
+    - logging bursts of sets
+    - occasionally syncing a large number of sets saved offline
+
+Throughput, p50/p95/p99 latency and errors are reported for each endpoint.
+
+The server can be started by this script, with gunicorn and a copy of a database
+created by tools/generate_dataset.py, e.g.
+
+    python tools/loadtest.py --start-server data/bench.db --workers 4 --clients 8
+
+If the server is started by this script, "database is locked" errors in its log are
+also counted for each endpoint. Alternatively, test a server that is already
+running with --url.
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# (endpoint, status, latency in seconds) for each request
+Result = Tuple[str, int, float]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Client:
+    """Simulated phone, making requests to the server over a single keep-alive
+    connection.
+
+    Parameters
+    ----------
+    url : str
+        Base URL of server
+    rng : random.Random
+        Random number generator
+    """
+
+    def __init__(self, url: str, rng: random.Random):
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.rng = rng
+        self.results: List[Result] = []
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        endpoint: str,
+        form: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Make request and record its status and latency
+
+        Parameters
+        ----------
+        method : str
+            HTTP method
+        path : str
+            Path, including query string
+        endpoint : str
+            Name to report request under
+        form : Optional[Dict[str, str]], optional
+            Form data to send in the request body
+
+        Returns
+        -------
+        str
+            Response body
+        """
+        body = urllib.parse.urlencode(form) if form else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+
+        start = time.perf_counter()
+        data = ""
+        status = 0
+        for _ in range(2):
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read().decode()
+                status = response.status
+                break
+            except (OSError, http.client.HTTPException):
+                # Connection was closed by the server, so reconnect and try again
+                self.connection.close()
+                self.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=30
+                )
+
+        self.results.append((endpoint, status, time.perf_counter() - start))
+        return data
+
+    def new_set(self, exerciseID: str) -> Dict[str, str]:
+        """Return form data for a new set, with values for every exercise type
+
+        Parameters
+        ----------
+        exerciseID : str
+            Exercise ID
+
+        Returns
+        -------
+        Dict[str, str]
+            Set data as sent by the app
+        """
+        return {
+            "exerciseID": exerciseID,
+            "reps": str(self.rng.randint(5, 12)),
+            "weight": str(self.rng.choice([20, 22.5, 25, 27.5])),
+            "distance": str(self.rng.choice([1000, 2000, 5000])),
+            "hours": "0",
+            "mins": str(self.rng.randint(1, 30)),
+            "secs": str(self.rng.randint(0, 59)),
+            "uuid": str(uuid.uuid4()),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc)
+            .isoformat()
+            .split(".")[0]
+            + "Z",
+        }
+
+    def session(self, sync_probability: float, sync_size: int) -> None:
+        """Simulate one use of the app: open the homepage, choose a workout, then
+        view some of its exercises and log a burst of sets for each.
+
+        Parameters
+        ----------
+        sync_probability : float
+            Probability of syncing sets saved offline at the start of the session
+        sync_size : int
+            Number of sets to sync
+        """
+        homepage = self.request("GET", "/", "GET /")
+        workoutIDs = re.findall(r'href="/workout/(\d+)"', homepage)
+        if not workoutIDs:
+            return
+
+        workoutID = self.rng.choice(workoutIDs)
+        workout = self.request("GET", f"/workout/{workoutID}", "GET /workout/<id>")
+        exerciseIDs = re.findall(r'href="/exercise/(\d+)\?', workout)
+        if not exerciseIDs:
+            return
+
+        if self.rng.random() < sync_probability:
+            offline_sets = [
+                self.new_set(self.rng.choice(exerciseIDs)) for _ in range(sync_size)
+            ]
+            self.request(
+                "POST",
+                "/sync",
+                "POST /sync",
+                {"offline_sets": json.dumps(offline_sets)},
+            )
+
+        for exerciseID in self.rng.sample(exerciseIDs, min(3, len(exerciseIDs))):
+            path = f"/exercise/{exerciseID}?workoutID={workoutID}"
+            self.request("GET", path, "GET /exercise/<id>")
+            for _ in range(self.rng.randint(1, 4)):
+                self.request("POST", "/set/", "POST /set/", self.new_set(exerciseID))
+                self.request("GET", path, "GET /exercise/<id>")
+
+
+def run_client(
+    url: str, duration: float, seed: int, sync_probability: float, sync_size: int
+) -> List[Result]:
+    """Run sessions against server until `duration` seconds have passed
+
+    Parameters
+    ----------
+    url : str
+        Base URL of server
+    duration : float
+        Time to run for, in seconds
+    seed : int
+        Random seed
+    sync_probability : float
+        Probability of syncing sets saved offline in each session
+    sync_size : int
+        Number of sets to sync
+
+    Returns
+    -------
+    List[Result]
+        Endpoint, status and latency of each request
+    """
+    client = Client(url, random.Random(seed))
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        client.session(sync_probability, sync_size)
+
+    return client.results
+
+
+def start_server(
+    database: str, workers: int, port: int
+) -> Tuple[subprocess.Popen, str]:
+    """Start gunicorn serving the app with a copy of database
+
+    Parameters
+    ----------
+    database : str
+        Database to copy
+    workers : int
+        Number of gunicorn workers
+    port : int
+        Port to listen on
+
+    Returns
+    -------
+    Tuple[subprocess.Popen, str]
+        gunicorn process
+        Path to file the server log is written to
+    """
+    tmpdir = tempfile.mkdtemp()
+    shutil.copyfile(database, os.path.join(tmpdir, "gym-log.db"))
+    log = os.path.join(tmpdir, "server.log")
+
+    env = {**os.environ, "GYMLOG_DATABASE": os.path.join(tmpdir, "gym-log.db")}
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--chdir",
+            ROOT,
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "--error-logfile",
+            log,
+            "gymlog:app",
+        ],
+        env=env,
+    )
+
+    # Wait for server to accept connections
+    for _ in range(100):
+        try:
+            http.client.HTTPConnection("127.0.0.1", port, timeout=1).connect()
+            break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        server.terminate()
+        sys.exit("Server did not start")
+
+    return server, log
+
+
+def count_lock_errors(log: str) -> Dict[str, int]:
+    """Count "database is locked" errors in server log for each endpoint
+
+    Parameters
+    ----------
+    log : str
+        Path to server log
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of lock errors, keyed by endpoint
+    """
+    with open(log) as f:
+        text = f.read()
+
+    lock_errors: Dict[str, int] = defaultdict(int)
+    # Each unhandled exception is logged as "Exception on <path> [<method>]"
+    # followed by the traceback
+    blocks = re.split(r"ERROR in app: Exception on ", text)[1:]
+    for block in blocks:
+        if "database is locked" in block:
+            match = re.match(r"(\S+) \[(\w+)\]", block)
+            if match:
+                path, method = match.groups()
+                # Strip query string and replace IDs, to match client endpoint names
+                path = re.sub(r"/\d+", "/<id>", path.split("?")[0])
+                lock_errors[f"{method} {path}"] += 1
+
+    return lock_errors
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return percentile of sorted values
+
+    Parameters
+    ----------
+    values : List[float]
+        Values, sorted in ascending order
+    pct : float
+        Percentile, between 0 and 100
+
+    Returns
+    -------
+    float
+        Value at percentile
+    """
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(
+    results: List[Result], duration: float, lock_errors: Dict[str, int]
+) -> Dict[str, Dict[str, float]]:
+    """Print and return throughput, latency and errors for each endpoint
+
+    Parameters
+    ----------
+    results : List[Result]
+        Endpoint, status and latency of each request
+    duration : float
+        Duration of test in seconds
+    lock_errors : Dict[str, int]
+        Number of "database is locked" errors for each endpoint
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        Statistics for each endpoint
+    """
+    by_endpoint: Dict[str, List[Result]] = defaultdict(list)
+    for result in results:
+        by_endpoint[result[0]].append(result)
+
+    summary = {}
+    print(
+        f"{'Endpoint':<20} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+        f" {'errors':>7} {'locked':>7}  (ms)"
+    )
+    for endpoint, endpoint_results in sorted(by_endpoint.items()):
+        latencies = sorted(latency * 1000 for _, _, latency in endpoint_results)
+        errors = sum(1 for _, status, _ in endpoint_results if not 200 <= status < 400)
+        summary[endpoint] = {
+            "requests": len(endpoint_results),
+            "throughput": len(endpoint_results) / duration,
+            "mean": statistics.mean(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "errors": errors,
+            "lock_errors": lock_errors.get(endpoint, 0),
+        }
+        s = summary[endpoint]
+        print(
+            f"{endpoint:<20} {s['throughput']:>8.1f} {s['p50']:>8.1f} {s['p95']:>8.1f}"
+            f" {s['p99']:>8.1f} {s['errors']:>7} {s['lock_errors']:>7}"
+        )
+
+    total = len(results)
+    print(f"{total} requests in {duration:.1f} s, {total / duration:.1f} req/s")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test gym log server")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of running server")
+    target.add_argument(
+        "--start-server",
+        metavar="DATABASE",
+        help="Start gunicorn with a copy of this database",
+    )
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--port", type=int, default=5050, help="Port for gunicorn")
+    parser.add_argument("--clients", type=int, default=4, help="Simulated phones")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument(
+        "--sync-probability",
+        type=float,
+        default=0.05,
+        help="Probability of syncing offline sets in each session",
+    )
+    parser.add_argument(
+        "--sync-size", type=int, default=200, help="Number of sets in each sync"
+    )
+    parser.add_argument("--output", help="Path to save results to as JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.start_server:
+        server, log = start_server(args.start_server, args.workers, args.port)
+        url = f"http://127.0.0.1:{args.port}"
+    else:
+        url = args.url
+
+    try:
+        start = time.monotonic()
+        with multiprocessing.Pool(args.clients) as pool:
+            client_results = pool.starmap(
+                run_client,
+                [
+                    (url, args.duration, seed, args.sync_probability, args.sync_size)
+                    for seed in range(args.clients)
+                ],
+            )
+        duration = time.monotonic() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lock_errors = count_lock_errors(log) if server is not None else {}
+    results = [result for results in client_results for result in results]
+    summary = report(results, duration, lock_errors)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "url": url,
+                    "workers": args.workers if server is not None else None,
+                    "clients": args.clients,
+                    "duration": duration,
+                    "endpoints": summary,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Saved results to {args.output}")